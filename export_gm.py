@@ -6,6 +6,7 @@ import sys
 import cProfile
 import bmesh
 import bpy
+import numpy
 from mathutils import Vector, Matrix
 from collections import defaultdict
 from bpy.props import BoolProperty, EnumProperty, StringProperty
@@ -171,36 +172,50 @@ def remove_blender_name_postfix(name):
     return re.sub(r'\.\d{3}', '', name)
 
 
+class NameTable:
+    # zero terminated names, each stored once; a name's offset is known as soon as it is added
+    def __init__(self):
+        self.offsets = {}
+        self.chunks = []
+        self.size = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, name):
+        offset = self.offsets.get(name)
+        if offset is None:
+            offset = self.size
+            encoded = name.encode("utf-8") + b'\0'
+            self.offsets[name] = offset
+            self.chunks.append(encoded)
+            self.size += len(encoded)
+        return offset
+
+    def get(self, name):
+        return self.offsets.get(name)
+
+    def to_bytes(self):
+        return b''.join(self.chunks)
+
+
 def prepare_globnames(objects, locators, materials, is_animated):
-    globnames = ['unknown material group']
+    globnames = NameTable()
+    globnames.add('unknown material group')
 
     for material in materials:
-        name = material.get("name")
-        if not (name in globnames):
-            globnames.append(name)
-        textures = material.get("textures")
-        for texture in textures:
-            if not (texture in globnames):
-                globnames.append(texture)
+        globnames.add(material.get("name"))
+        for texture in material.get("textures"):
+            globnames.add(texture)
 
     for object in objects:
-        name = remove_blender_name_postfix(object.name)
-        parent_name = remove_blender_name_postfix(object.parent.name)
-
-        if not (name in globnames):
-            globnames.append(name)
-        if not (parent_name in globnames):
-            globnames.append(parent_name)
+        globnames.add(remove_blender_name_postfix(object.name))
+        globnames.add(remove_blender_name_postfix(object.parent.name))
 
     for locator in locators:
-        name = remove_blender_name_postfix(locator.name)
-        parent_name = remove_blender_name_postfix(locator.parent_bone) if is_animated else remove_blender_name_postfix(
-            locator.parent.name)
-
-        if not (name in globnames):
-            globnames.append(name)
-        if not (parent_name in globnames):
-            globnames.append(parent_name)
+        globnames.add(remove_blender_name_postfix(locator.name))
+        globnames.add(remove_blender_name_postfix(locator.parent_bone) if is_animated else remove_blender_name_postfix(
+            locator.parent.name))
 
     return globnames
 
@@ -212,91 +227,132 @@ def write_vector(file, value):
     file.write(struct.pack('<f', z))
 
 
-def write_color(file, value):
-    [r, g, b, a] = value
-    file.write(struct.pack('<B', r))
-    file.write(struct.pack('<B', g))
-    file.write(struct.pack('<B', b))
-    file.write(struct.pack('<B', a))
+def get_vertex_dtype(vertex_type):
+    # layout of one vertex, matches stride 36 + (type & 3) * 8 + (type >> 2) * 8
+    fields = [("pos", "<f4", (3,))]
+    if vertex_type >> 2:
+        fields += [("weight", "<f4"), ("boneId", "<u4")]
+    fields += [
+        ("norm", "<f4", (3,)),
+        ("color", "u1", (4,)),
+        ("uv", "<f4", (1 + (vertex_type & 3), 2)),
+    ]
+    return numpy.dtype(fields)
+
+
+def write_vertex_buffer(file, vertex_buffer):
+    vertex_type = vertex_buffer.get("type")
+    vertices_quantity = len(vertex_buffer.get("vertices"))
+    if vertices_quantity == 0:
+        return
+
+    # the whole buffer is packed at once and written in one call
+    vertices = numpy.empty(vertices_quantity, dtype=get_vertex_dtype(vertex_type))
+    vertices["pos"] = vertex_buffer.get("vertices")
+    vertices["norm"] = vertex_buffer.get("normals")
+    vertices["color"] = vertex_buffer.get("colors")
+    vertices["uv"][:, 0] = vertex_buffer.get("uv_array")
+    if vertex_type & 3:
+        vertices["uv"][:, 1] = vertex_buffer.get("uv_normals_array")
+    if vertex_type >> 2:
+        vertices["weight"] = vertex_buffer.get("weights")
+        vertices["boneId"] = vertex_buffer.get("bone_ids")
+
+    file.write(vertices.tobytes())
+
+
+def smooth_out(coords, normals, marks, smooth_out_normals):
+    normals = numpy.asarray(normals, dtype=numpy.float64).reshape(-1, 3)
+
+    if marks is None and smooth_out_normals == 'marked':
+        smooth_out_normals = 'no'
 
+    if smooth_out_normals == 'no':
+        return normals.copy()
 
-def write_vertex0(file, pos, norm, color, tu0, tv0):
-    write_vector(file, pos)
-    write_vector(file, norm)
-    write_color(file, color)
+    # coincident vertices share a quantized position, 1e-10 steps like the 10 decimals they used to be compared with
+    keys = numpy.round(numpy.asarray(coords, dtype=numpy.float64).reshape(-1, 3) * 1e10).astype(numpy.int64)
+    keys = numpy.ascontiguousarray(keys).view(numpy.dtype((numpy.void, keys.itemsize * 3))).ravel()
+    _, groups, group_sizes = numpy.unique(keys, return_inverse=True, return_counts=True)
+    groups = groups.ravel()
 
-    file.write(struct.pack('<f', tu0))
-    file.write(struct.pack('<f', tv0))
+    smoothed = numpy.asarray(marks, dtype=bool) if smooth_out_normals == 'marked' else numpy.ones(len(normals), dtype=bool)
+    smoothed_groups = groups[smoothed]
 
+    # unmarked vertices keep their normal but still count in the group size
+    sums = numpy.empty((len(group_sizes), 3), dtype=numpy.float64)
+    for axis in range(3):
+        sums[:, axis] = numpy.bincount(smoothed_groups, weights=normals[smoothed, axis], minlength=len(group_sizes))
 
-def write_vertex1(file, pos, norm, color, tu0, tv0, tu1, tv1):
-    write_vector(file, pos)
-    write_vector(file, norm)
-    write_color(file, color)
+    result = normals.copy()
+    result[smoothed] = sums[smoothed_groups] / group_sizes[smoothed_groups, None]
+    return result
 
-    file.write(struct.pack('<f', tu0))
-    file.write(struct.pack('<f', tv0))
 
-    file.write(struct.pack('<f', tu1))
-    file.write(struct.pack('<f', tv1))
+def get_last_loops(mesh):
+    loop_vertices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    loop_starts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
 
+    # loops in the order polygons visit them; a vertex takes its value from the last of its loops
+    visit_order = numpy.repeat(loop_starts - (numpy.cumsum(loop_totals) - loop_totals), loop_totals) + \
+        numpy.arange(loop_totals.sum())
+    reversed_order = visit_order[::-1]
+    looped_vertices, last = numpy.unique(loop_vertices[reversed_order], return_index=True)
+    return looped_vertices, reversed_order[last]
 
-def write_avertex0(file, pos, weight, bone_id, norm, color, tu0, tv0,):
-    write_vector(file, pos)
-    file.write(struct.pack('<f', weight))
-    file.write(struct.pack('<L', bone_id))
-    write_vector(file, norm)
-    write_color(file, color)
 
-    file.write(struct.pack('<f', tu0))
-    file.write(struct.pack('<f', tv0))
+def get_vertex_uvs(uv_layer, vertices_quantity, looped_vertices, last_loops):
+    loop_uvs = numpy.empty(len(uv_layer.data) * 2, dtype=numpy.float32)
+    uv_layer.data.foreach_get("uv", loop_uvs)
 
+    uvs = numpy.zeros((vertices_quantity, 2), dtype=numpy.float32)
+    uvs[looped_vertices] = loop_uvs.reshape(-1, 2)[last_loops] * numpy.array([1, -1], dtype=numpy.float32)
+    return uvs
 
-def vert_to_string(v):
-    return '{:.10f}:{:.10f}:{:.10f}'.format(v.co.x, v.co.y, v.co.z)
-def smooth_out(verts, smooth_out_normals, layer):
 
-    if layer is None and smooth_out_normals == 'marked':
-        smooth_out_normals = 'no'
+def get_skin_weights(vertices, vertex_groups, bone_indices):
+    group_bones = numpy.array([bone_indices.get(vertex_group.name, -1) for vertex_group in vertex_groups], dtype=numpy.int64)
 
-    if smooth_out_normals == 'no':
-        return [Vector(vertex.normal) for vertex in verts]
-        
-    order = range(len(verts))[:]
-    
-    order = sorted(order, key=lambda o: vert_to_string(verts[o]))
-    
-    vert_count = len(verts)
-    norms = [0] * vert_count
-    i = 0
-    
-    while(i < vert_count):
-        j = i;
-        i_str = vert_to_string(verts[order[i]])
-        while(j < vert_count):
-            j_str = vert_to_string(verts[order[j]])
-            if i_str != j_str:
-                break
-            j += 1
-        norm = [0.0, 0.0, 0.0]
-        for k in range(i, j):
-            if smooth_out_normals == 'marked' and not verts[order[k]][layer]:
-                continue
-            norm[0] += verts[order[k]].normal[0]
-            norm[1] += verts[order[k]].normal[1]
-            norm[2] += verts[order[k]].normal[2]
-            
-            
-        norm = [n / (j - i) for n in norm]
-        
-        for k in range(i, j):
-            if smooth_out_normals == 'marked' and not verts[order[k]][layer]:
-                #print('smooth unmarked')
-                norms[order[k]] = Vector(verts[order[k]].normal)
-                continue
-            norms[order[k]] = Vector(norm)
-        i = j
-    return norms
+    vertex_ids = []
+    group_ids = []
+    weights = []
+    for vertex in vertices:
+        for vertex_group in vertex.groups:
+            vertex_ids.append(vertex.index)
+            group_ids.append(vertex_group.group)
+            weights.append(vertex_group.weight)
+
+    vertex_ids = numpy.array(vertex_ids, dtype=numpy.int64)
+    group_ids = numpy.array(group_ids, dtype=numpy.int64)
+    bones = group_bones[group_ids]
+    weights = numpy.array(weights, dtype=numpy.float64)
+
+    for group_idx in numpy.unique(group_ids[bones < 0]).tolist():
+        print(vertex_groups[group_idx].name + ' is missing in armature!')
+
+    # heaviest two per vertex; equal weights keep the group listed first, as the strict > comparison did
+    order = numpy.flatnonzero((bones >= 0) & (weights > 0))
+    order = order[numpy.lexsort((order, -weights[order], vertex_ids[order]))]
+    vertex_ids = vertex_ids[order]
+    bones = bones[order]
+    weights = weights[order]
+
+    firsts = numpy.flatnonzero(numpy.diff(vertex_ids, prepend=-1) != 0)
+    seconds = firsts + 1
+    seconds = seconds[(seconds < len(vertex_ids)) & (vertex_ids[seconds.clip(max=len(vertex_ids) - 1)] == vertex_ids[firsts])]
+
+    weight_1 = numpy.zeros(len(vertices), dtype=numpy.float64)
+    bone_1 = numpy.zeros(len(vertices), dtype=numpy.int64)
+    bone_2 = numpy.zeros(len(vertices), dtype=numpy.int64)
+    weight_1[vertex_ids[firsts]] = weights[firsts]
+    bone_1[vertex_ids[firsts]] = bones[firsts]
+    bone_2[vertex_ids[seconds]] = bones[seconds]
+
+    return weight_1.tolist(), ((bone_2 << 8) | bone_1).tolist()
 
 
 def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False, prepare_uv=False, patch_start_pose=False, set_bsp_flag=False):
@@ -315,6 +371,7 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
     objects = []
     locators = []
     bones_list = []
+    bone_indices = {}
 
     vertices = []
     faces = []
@@ -356,6 +413,8 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
             root_bone = child.data.bones[0]
             bones_list = root_bone.children_recursive
             bones_list.insert(0, root_bone)
+            for bone_idx, bone in enumerate(bones_list):
+                bone_indices.setdefault(bone.name, bone_idx)
 
             for child in armature_obj.children:
                 if child.type == 'EMPTY':
@@ -442,7 +501,6 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
         obj_vertices = obj_data.vertices
         obj_vertices_coords = []
         obj_normals = []
-        obj_polygons = obj_data.polygons
         obj_faces = []
 
         # TODO get active?
@@ -467,7 +525,20 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
                 src_obj.name + ' vertices_quantity bigger than 65536!')
         
         verts = bm.verts[:]
-        n_vectors = smooth_out(verts, smooth_out_normals, layer)
+
+        obj_coords = numpy.empty(vertices_quantity * 3, dtype=numpy.float32)
+        obj_data.vertices.foreach_get("co", obj_coords)
+
+        obj_marks = None
+        marks_attribute = obj_data.attributes.get(vertex_smooth_mark_name)
+        if layer is not None and marks_attribute is not None:
+            obj_marks = numpy.empty(vertices_quantity, dtype=bool)
+            marks_attribute.data.foreach_get("value", obj_marks)
+
+        # bmesh normals, the mesh recalculates its own after the seams split and they no longer match across seams
+        bm_normals = numpy.array([vertex.normal for vertex in verts], dtype=numpy.float64)
+
+        n_vectors = [Vector(norm) for norm in smooth_out(obj_coords, bm_normals, obj_marks, smooth_out_normals).tolist()]
         
         if len(n_vectors) != vertices_quantity:
             raise ValueError('len(n_vectors) != vertices_quantity')
@@ -505,55 +576,25 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
         obj_bone_ids = []
 
         if is_animated:
-            for vertex in obj_vertices:
-                bone_1 = 0
-                bone_2 = 0
-                weight_1 = 0
-                weight_2 = 0
-                for vertex_group in vertex.groups:
-                    current_weight = vertex_group.weight
-
-                    vertex_group_name = obj_vertex_groups[vertex_group.group].name
-                    try:
-                        vertex_bone = next(
-                            filter(lambda x: x.name == vertex_group_name, bones_list))
-                        vertex_group_id = bones_list.index(vertex_bone)
-
-                        if current_weight > weight_1:
-                            weight_2 = weight_1
-                            weight_1 = current_weight
-                            bone_2 = bone_1
-                            bone_1 = int(vertex_group_id)
-                        elif current_weight > weight_2:
-                            weight_2 = current_weight
-                            bone_2 = int(vertex_group_id)
-                    except StopIteration as e:
-                        print(vertex_group_name + ' is missing in armature!')
-
-                obj_weights.append(weight_1)
-                obj_bone_ids.append((bone_2 << 8) | (bone_1 << 0))
-
-        obj_colors = [[127, 127, 127, 255]] * len(obj_vertices)
-        obj_uv_array = [[0, 0]] * len(obj_vertices)
+            (obj_weights, obj_bone_ids) = get_skin_weights(obj_vertices, obj_vertex_groups, bone_indices)
 
         has_uv_normals = len(material.get(
             "textures")) == 2 and obj_uv_normals_layer
 
-        obj_uv_normals_array = [
-            [0, 0]] * len(obj_vertices) if has_uv_normals else [None] * len(obj_vertices)
-
-        for polygon in obj_polygons:
-            for i, index in enumerate(polygon.vertices):
-                loop_index = polygon.loop_indices[i]
-                if obj_vertex_color:
-                    [r, g, b, a] = obj_vertex_color.data[loop_index].color[:]
-                    obj_colors[index] = [int(r*255), int(g*255),
-                                         int(b*255), int(a*255)]
-                obj_uv_array[index] = Vector(
-                    obj_uv_layer.data[loop_index].uv) * Vector([1, -1])
-                if has_uv_normals:
-                    obj_uv_normals_array[index] = Vector(
-                        obj_uv_normals_layer.data[loop_index].uv) * Vector([1, -1])
+        (looped_vertices, last_loops) = get_last_loops(obj_data)
+
+        obj_colors = numpy.full((len(obj_vertices), 4), [127, 127, 127, 255], dtype=numpy.int64)
+        if obj_vertex_color:
+            loop_colors = numpy.empty(len(obj_data.loops) * 4, dtype=numpy.float32)
+            obj_vertex_color.data.foreach_get("color", loop_colors)
+            # scaled in double precision like int(r*255) on the Python floats was
+            obj_colors[looped_vertices] = (loop_colors.reshape(-1, 4)[last_loops].astype(numpy.float64) * 255).astype(numpy.int64)
+        obj_colors = obj_colors.tolist()
+
+        obj_uv_array = get_vertex_uvs(obj_uv_layer, len(obj_vertices), looped_vertices, last_loops).tolist()
+
+        obj_uv_normals_array = get_vertex_uvs(obj_uv_normals_layer, len(obj_vertices), looped_vertices, last_loops).tolist(
+        ) if has_uv_normals else [None] * len(obj_vertices)
 
         bounding_box = get_bounding_box_coords([obj], x_is_mirrored)
         bounding_boxes.append(bounding_box)
@@ -653,9 +694,7 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
         globnames = prepare_globnames(
             objects, locators, materials, is_animated)
 
-        globname = '\0'.join(globnames) + '\0'
-
-        header_name_size = len(globname)
+        header_name_size = globnames.size
         file.write(struct.pack('<l', header_name_size))
 
         header_names_quantity = len(globnames)
@@ -695,40 +734,27 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
         header_radius = get_box_radius(header_bboxCenter, vertices)
         file.write(struct.pack('<f', header_radius))
 
-        for c in globname:
-            file.write(struct.pack('<s', c.encode("utf-8")))
-
-        current_name_offset = 0
-        names_offsets = [current_name_offset]
-        for i in range(header_names_quantity):
-            file.write(struct.pack('<l', current_name_offset))
-            current_name_offset = globname.index('\0', current_name_offset) + 1
-            names_offsets.append(current_name_offset)
+        file.write(globnames.to_bytes())
 
-        index_by_names = {}
-        for i in range(header_names_quantity):
-            offset = names_offsets[i]
-            next_offset = header_name_size if i == header_names_quantity - \
-                1 else names_offsets[i + 1]
-            name = globname[offset:next_offset].replace('\0', '')
-            index_by_names[name] = offset
+        names_offsets = list(globnames.offsets.values())
+        file.write(struct.pack('<{}l'.format(header_names_quantity), *names_offsets))
 
         # TODO
         for i in range(header_ntextures):
             current_texture_name = textures[i]
-            current_texture_name_offset = index_by_names.get(
+            current_texture_name_offset = globnames.get(
                 current_texture_name)
             file.write(struct.pack('<l', current_texture_name_offset))
 
         for i in range(header_nmaterials):
             material = materials[i]
 
-            material_group_name_idx = index_by_names.get(
+            material_group_name_idx = globnames.get(
                 'unknown material group')
             file.write(struct.pack('<l', material_group_name_idx))
 
             material_name = material.get("name")
-            material_name_idx = index_by_names.get(material_name)
+            material_name_idx = globnames.get(material_name)
             file.write(struct.pack('<l', material_name_idx))
 
             material_diffuse = 0.8
@@ -771,10 +797,10 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
             label_group_name = remove_blender_name_postfix(locator.parent_bone) if is_animated else remove_blender_name_postfix(
                 locator.parent.name)
 
-            label_group_name_idx = index_by_names.get(label_group_name)
+            label_group_name_idx = globnames.get(label_group_name)
             file.write(struct.pack('<l', label_group_name_idx))
 
-            label_name_idx = index_by_names.get(label_name)
+            label_name_idx = globnames.get(label_name)
             file.write(struct.pack('<l', label_name_idx))
 
             label_flags = 0
@@ -801,9 +827,7 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
             ]
 
             if is_animated:
-                label_bone = next(
-                    filter(lambda x: x.name == locator.parent_bone, bones_list))
-                label_bones[0] = bones_list.index(label_bone)
+                label_bones[0] = bone_indices[locator.parent_bone]
 
             for i in range(4):
                 file.write(struct.pack('<l', label_bones[i]))
@@ -817,11 +841,11 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
 
             object_group_name = remove_blender_name_postfix(
                 objects[i].parent.name)
-            object_group_name_idx = index_by_names.get(object_group_name)
+            object_group_name_idx = globnames.get(object_group_name)
             file.write(struct.pack('<l', object_group_name_idx))
 
             object_name = remove_blender_name_postfix(objects[i].name)
-            object_name_idx = index_by_names.get(object_name)
+            object_name_idx = globnames.get(object_name)
             file.write(struct.pack('<l', object_name_idx))
 
             # TODO check
@@ -878,25 +902,7 @@ def export_gm(context, file_path="", triangulate=False, smooth_out_normals=False
             file.write(struct.pack('<l', vertex_buffer_size))
 
         for vertex_buffer in vertex_buffers:
-            vertex_type = vertex_buffer.get("type")
-            buffer_vertices = vertex_buffer.get("vertices")
-            buffer_normals = vertex_buffer.get("normals")
-            buffer_colors = vertex_buffer.get("colors")
-            buffer_weights = vertex_buffer.get("weights")
-            buffer_bone_ids = vertex_buffer.get("bone_ids")
-            buffer_uv_array = vertex_buffer.get("uv_array")
-            buffer_uv_normals_array = vertex_buffer.get("uv_normals_array")
-
-            for i in range(len(buffer_vertices)):
-                if vertex_type == 0:
-                    write_vertex0(file, buffer_vertices[i], buffer_normals[i], buffer_colors[i],
-                                  buffer_uv_array[i][0], buffer_uv_array[i][1])
-                if vertex_type == 1:
-                    write_vertex1(file, buffer_vertices[i], buffer_normals[i], buffer_colors[i],
-                                  buffer_uv_array[i][0], buffer_uv_array[i][1], buffer_uv_normals_array[i][0], buffer_uv_normals_array[i][1])
-                if vertex_type == 4:
-                    write_avertex0(file, buffer_vertices[i], buffer_weights[i], buffer_bone_ids[i], buffer_normals[i],
-                                   buffer_colors[i], buffer_uv_array[i][0], buffer_uv_array[i][1])
+            write_vertex_buffer(file, vertex_buffer)
 
     # pr.disable()
     # pr.print_stats(2)
@@ -0,0 +1,245 @@
+import os
+import sys
+
+import numpy
+
+
+# GM layout, same as import_gm.GmReader reads it
+header_dtype = numpy.dtype([
+    ("version", "<i4"),
+    ("flags", "<i4"),
+    ("nameSize", "<i4"),
+    ("namesQuantity", "<i4"),
+    ("ntextures", "<i4"),
+    ("nmaterials", "<i4"),
+    ("nlights", "<i4"),
+    ("nlabels", "<i4"),
+    ("nobjects", "<i4"),
+    ("ntriangles", "<i4"),
+    ("nvrtbuffs", "<i4"),
+    ("bboxSize", "<f4", (3,)),
+    ("bboxCenter", "<f4", (3,)),
+    ("radius", "<f4"),
+])
+
+material_dtype = numpy.dtype([
+    ("groupName", "<i4"),
+    ("name", "<i4"),
+    ("diffuse", "<f4"),
+    ("specular", "<f4"),
+    ("gloss", "<f4"),
+    ("selfIllum", "<f4"),
+    ("textureType", "<i4", (4,)),
+    ("texture", "<i4", (4,)),
+])
+
+label_dtype = numpy.dtype([
+    ("groupName", "<i4"),
+    ("name", "<i4"),
+    ("flags", "<i4"),
+    ("m", "<f4", (4, 4)),
+    ("bones", "<i4", (4,)),
+    ("weight", "<f4", (4,)),
+])
+
+object_dtype = numpy.dtype([
+    ("groupName", "<i4"),
+    ("name", "<i4"),
+    ("flags", "<i4"),
+    ("center", "<f4", (3,)),
+    ("radius", "<f4"),
+    ("vertexBuff", "<i4"),
+    ("ntriangles", "<i4"),
+    ("striangle", "<i4"),
+    ("nvertices", "<i4"),
+    ("svertex", "<i4"),
+    ("material", "<i4"),
+    ("lights", "<i4", (8,)),
+    ("bones", "<i4", (4,)),
+    ("atriangles", "<i4"),
+])
+
+vertex_buffer_dtype = numpy.dtype([
+    ("type", "<i4"),
+    ("size", "<i4"),
+])
+
+# vertex types the importer knows how to decode
+known_vertex_types = (0, 1, 4)
+
+max_reported = 5
+
+# generate_bsp appends the BSP block after the vertex data of such files
+FLAGS_BSP_PRESENT = 2
+
+
+class CorruptedGm(Exception):
+    pass
+
+
+class Cursor:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def take(self, dtype, count, what):
+        if count < 0:
+            raise CorruptedGm('negative {} count {}'.format(what, count))
+        size = dtype.itemsize * count
+        if self.offset + size > len(self.data):
+            raise CorruptedGm('{} table ends at {}, file size is {}'.format(what, self.offset + size, len(self.data)))
+        result = numpy.frombuffer(self.data, dtype=dtype, count=count, offset=self.offset)
+        self.offset += size
+        return result
+
+
+def format_indices(indices):
+    shown = [str(i) for i in indices[:max_reported]]
+    return ', '.join(shown) + (', ...' if len(indices) > max_reported else '')
+
+
+def check_name_refs(errors, what, refs, name_size):
+    bad = numpy.flatnonzero((refs < 0) | (refs >= name_size))
+    if len(bad) > 0:
+        errors.append('{} {}: name offset outside of name table ({} bytes)'.format(
+            what, format_indices(bad), name_size))
+
+
+def check_gm(file_path):
+    with open(file_path, mode='rb') as file:
+        data = file.read()
+
+    errors = []
+    cursor = Cursor(data)
+    try:
+        header = cursor.take(header_dtype, 1, 'header')[0]
+        name_size = int(header["nameSize"])
+
+        if name_size < 0 or cursor.offset + name_size > len(data):
+            raise CorruptedGm('name table of {} bytes does not fit the file'.format(name_size))
+        cursor.offset += name_size
+
+        names_offsets = cursor.take(numpy.dtype("<i4"), int(header["namesQuantity"]), 'names')
+        check_name_refs(errors, 'name', names_offsets, name_size)
+
+        textures = cursor.take(numpy.dtype("<i4"), int(header["ntextures"]), 'textures')
+        check_name_refs(errors, 'texture', textures, name_size)
+
+        materials = cursor.take(material_dtype, int(header["nmaterials"]), 'materials')
+        check_name_refs(errors, 'material group', materials["groupName"], name_size)
+        check_name_refs(errors, 'material', materials["name"], name_size)
+        material_textures = materials["texture"]
+        bad = numpy.flatnonzero(((material_textures < -1) | (material_textures >= len(textures))).any(axis=1))
+        if len(bad) > 0:
+            errors.append('material {}: texture index out of {} textures'.format(format_indices(bad), len(textures)))
+
+        labels = cursor.take(label_dtype, int(header["nlabels"]), 'labels')
+        check_name_refs(errors, 'label group', labels["groupName"], name_size)
+        check_name_refs(errors, 'label', labels["name"], name_size)
+
+        objects = cursor.take(object_dtype, int(header["nobjects"]), 'objects')
+        check_name_refs(errors, 'object group', objects["groupName"], name_size)
+        check_name_refs(errors, 'object', objects["name"], name_size)
+
+        ntriangles = int(header["ntriangles"])
+        triangles = cursor.take(numpy.dtype("<u2"), ntriangles * 3, 'triangles').reshape(-1, 3)
+
+        vertex_buffers = cursor.take(vertex_buffer_dtype, int(header["nvrtbuffs"]), 'vertex buffers')
+        types = vertex_buffers["type"].astype(numpy.int64)
+        sizes = vertex_buffers["size"].astype(numpy.int64)
+        strides = 36 + (types & 3) * 8 + (types >> 2) * 8
+
+        bad = numpy.flatnonzero(~numpy.isin(types, known_vertex_types))
+        if len(bad) > 0:
+            errors.append('vertex buffer {}: unknown type {}'.format(format_indices(bad), format_indices(types[bad])))
+        bad = numpy.flatnonzero((sizes < 0) | (sizes % strides != 0))
+        if len(bad) > 0:
+            errors.append('vertex buffer {}: size is not a multiple of stride'.format(format_indices(bad)))
+
+        data_end = cursor.offset + int(sizes.clip(min=0).sum())
+        if data_end > len(data):
+            errors.append('vertex data ends at {}, file size is {}'.format(data_end, len(data)))
+        elif data_end < len(data) and not int(header["flags"]) & FLAGS_BSP_PRESENT:
+            errors.append('{} trailing bytes after vertex data'.format(len(data) - data_end))
+
+        nverts = sizes.clip(min=0) // strides
+
+        bad = numpy.flatnonzero((objects["material"] < 0) | (objects["material"] >= len(materials)))
+        if len(bad) > 0:
+            errors.append('object {}: material index out of {} materials'.format(format_indices(bad), len(materials)))
+
+        vertex_buff = objects["vertexBuff"].astype(numpy.int64)
+        valid_buff = (vertex_buff >= 0) & (vertex_buff < len(vertex_buffers))
+        bad = numpy.flatnonzero(~valid_buff)
+        if len(bad) > 0:
+            errors.append('object {}: vertex buffer index out of {} buffers'.format(format_indices(bad), len(vertex_buffers)))
+
+        svertex = objects["svertex"].astype(numpy.int64)
+        nvertices = objects["nvertices"].astype(numpy.int64)
+        buffer_nverts = numpy.zeros(len(objects), dtype=numpy.int64)
+        buffer_nverts[valid_buff] = nverts[vertex_buff[valid_buff]]
+        bad = numpy.flatnonzero(valid_buff & ((svertex < 0) | (nvertices < 0) | (svertex + nvertices > buffer_nverts)))
+        if len(bad) > 0:
+            errors.append('object {}: svertex/nvertices range does not fit its vertex buffer'.format(format_indices(bad)))
+
+        striangle = objects["striangle"].astype(numpy.int64)
+        object_ntriangles = objects["ntriangles"].astype(numpy.int64)
+        valid_range = (striangle >= 0) & (object_ntriangles >= 0) & (striangle + object_ntriangles <= ntriangles)
+        bad = numpy.flatnonzero(~valid_range)
+        if len(bad) > 0:
+            errors.append('object {}: striangle/ntriangles range does not fit {} triangles'.format(format_indices(bad), ntriangles))
+
+        # every triangle of every object against that object's vertex count, in one pass
+        counts = numpy.where(valid_range, object_ntriangles, 0)
+        owners = numpy.repeat(numpy.arange(len(objects)), counts)
+        starts = numpy.cumsum(counts) - counts
+        triangle_idx = numpy.arange(len(owners)) - numpy.repeat(starts, counts) + numpy.repeat(striangle, counts)
+        out_of_range = triangles[triangle_idx].max(axis=1) >= numpy.repeat(nvertices, counts)
+        bad_owners, bad_counts = numpy.unique(owners[out_of_range], return_counts=True)
+        for owner, count in list(zip(bad_owners, bad_counts))[:max_reported]:
+            errors.append('object {}: {} triangles index vertices beyond nvertices={}'.format(
+                owner, count, nvertices[owner]))
+
+    except CorruptedGm as error:
+        errors.append(str(error))
+
+    return errors
+
+
+def iter_gm_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith('.gm'):
+                        yield os.path.join(dirpath, filename)
+        else:
+            yield path
+
+
+def check_paths(paths, output):
+    checked = 0
+    corrupted = 0
+    for file_path in iter_gm_files(paths):
+        checked += 1
+        try:
+            errors = check_gm(file_path)
+        except OSError as error:
+            errors = [str(error)]
+        if len(errors) > 0:
+            corrupted += 1
+            for error in errors:
+                output.write('{}: {}\n'.format(file_path, error))
+
+    output.write('checked {} files, {} with errors\n'.format(checked, corrupted))
+    return corrupted
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2:
+        corrupted = check_paths(sys.argv[1:], sys.stdout)
+        sys.exit(1 if corrupted > 0 else 0)
+
+    else:
+        sys.stderr.write('Wrong syntax. Usage: \n{} <file.gm or resource folder> [...]\n'.format(sys.argv[0]))
+        sys.exit(2)
@@ -0,0 +1,163 @@
+import os
+import sys
+
+import numpy
+
+from check_gm import (
+    CorruptedGm,
+    Cursor,
+    header_dtype,
+    iter_gm_files,
+    label_dtype,
+    material_dtype,
+    object_dtype,
+    vertex_buffer_dtype,
+)
+
+
+def read_exactly(file, size, what):
+    data = file.read(size)
+    if len(data) < size:
+        raise CorruptedGm('{} do not fit the file'.format(what))
+    return data
+
+
+def get_names(globname, offsets):
+    try:
+        globname.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError as error:
+        encoding = "cp1251"
+
+    names = []
+    for offset in offsets:
+        offset = int(offset)
+        if not 0 <= offset < len(globname):
+            raise CorruptedGm('name offset {} outside of name table ({} bytes)'.format(offset, len(globname)))
+        end = globname.find(b'\0', offset)
+        names.append(globname[offset:end if end >= 0 else len(globname)].decode(encoding))
+    return names
+
+
+def get_texture_file_name(texture_name):
+    # same as import_gm.get_texture_file_name
+    texture_file = texture_name.split('\\')[-1]
+    texture_file = texture_file.split('/')[-1]
+    if texture_file.endswith('.tga.tx'):
+        texture_file = texture_file[:-3]
+    return texture_file
+
+
+def scan_gm(file_path):
+    # header and tables only, triangles are skipped and vertex data is never read
+    with open(file_path, mode='rb') as file:
+        header = numpy.frombuffer(read_exactly(file, header_dtype.itemsize, 'header'), dtype=header_dtype)[0]
+        name_size = int(header["nameSize"])
+        counts = [int(header[field]) for field in ("namesQuantity", "ntextures", "nmaterials", "nlabels", "nobjects", "ntriangles", "nvrtbuffs")]
+        if name_size < 0 or min(counts) < 0:
+            raise CorruptedGm('negative table size in header')
+        names_quantity, ntextures, nmaterials, nlabels, nobjects, ntriangles, nvrtbuffs = counts
+
+        tables_size = (name_size + (names_quantity + ntextures) * 4 + nmaterials * material_dtype.itemsize +
+                       nlabels * label_dtype.itemsize + nobjects * object_dtype.itemsize)
+        cursor = Cursor(read_exactly(file, tables_size, 'tables'))
+        globname = cursor.data[:name_size]
+        cursor.offset = name_size
+        cursor.take(numpy.dtype("<i4"), names_quantity, 'names')
+        textures = cursor.take(numpy.dtype("<i4"), ntextures, 'textures')
+        materials = cursor.take(material_dtype, nmaterials, 'materials')
+        labels = cursor.take(label_dtype, nlabels, 'labels')
+        objects = cursor.take(object_dtype, nobjects, 'objects')
+
+        file.seek(ntriangles * 6, os.SEEK_CUR)
+        vertex_buffers = numpy.frombuffer(
+            read_exactly(file, nvrtbuffs * vertex_buffer_dtype.itemsize, 'vertex buffers'), dtype=vertex_buffer_dtype)
+
+    texture_names = get_names(globname, textures)
+    material_texture = materials["texture"]
+    if ((material_texture < -1) | (material_texture >= ntextures)).any():
+        raise CorruptedGm('material texture index out of {} textures'.format(ntextures))
+
+    material_names = get_names(globname, materials["name"])
+    types = vertex_buffers["type"].astype(numpy.int64)
+    strides = 36 + (types & 3) * 8 + (types >> 2) * 8
+
+    return {
+        "path": file_path,
+        "isAnimated": bool((types >> 2).any()),
+        "nvertices": int((vertex_buffers["size"] // strides).sum()),
+        "ntriangles": ntriangles,
+        "bboxSize": header["bboxSize"].tolist(),
+        "bboxCenter": header["bboxCenter"].tolist(),
+        "radius": float(header["radius"]),
+        "textures": texture_names,
+        "materials": [{
+            "groupName": group_name,
+            "name": name,
+            "textureNames": [texture_names[i] for i in texture_idx if i >= 0],
+        } for group_name, name, texture_idx in zip(get_names(globname, materials["groupName"]), material_names, material_texture.tolist())],
+        "labels": [{
+            "groupName": group_name,
+            "name": name,
+        } for group_name, name in zip(get_names(globname, labels["groupName"]), get_names(globname, labels["name"]))],
+        "objects": [{
+            "groupName": group_name,
+            "name": name,
+            "material": material_names[material_idx] if 0 <= material_idx < nmaterials else None,
+            "nvertices": nvertices,
+            "ntriangles": object_ntriangles,
+        } for group_name, name, material_idx, nvertices, object_ntriangles in zip(
+            get_names(globname, objects["groupName"]), get_names(globname, objects["name"]),
+            objects["material"].tolist(), objects["nvertices"].tolist(), objects["ntriangles"].tolist())],
+    }
+
+
+def scan_gm_tree(paths, output=sys.stderr):
+    index = []
+    for file_path in iter_gm_files(paths):
+        try:
+            index.append(scan_gm(file_path))
+        except (OSError, CorruptedGm) as error:
+            output.write('{}: can\'t scan: {}\n'.format(file_path, error))
+    return index
+
+
+def find_gm_using_texture(index, texture_name):
+    texture_file = get_texture_file_name(texture_name).lower()
+    return [entry for entry in index
+            if any(get_texture_file_name(name).lower() == texture_file for name in entry["textures"])]
+
+
+def find_gm_exceeding_triangles(index, ntriangles):
+    return [entry for entry in index if entry["ntriangles"] > ntriangles]
+
+
+def print_entries(entries, output):
+    for entry in entries:
+        output.write('{}: {} triangles, {} vertices, textures: {}\n'.format(
+            entry["path"], entry["ntriangles"], entry["nvertices"], ', '.join(entry["textures"])))
+    output.write('{} files\n'.format(len(entries)))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    texture_name = None
+    ntriangles = None
+    while len(args) >= 2 and args[0] in ('-t', '-n'):
+        if args[0] == '-t':
+            texture_name = args[1]
+        else:
+            ntriangles = int(args[1])
+        args = args[2:]
+
+    if len(args) >= 1 and not args[0].startswith('-'):
+        index = scan_gm_tree(args)
+        if texture_name is not None:
+            index = find_gm_using_texture(index, texture_name)
+        if ntriangles is not None:
+            index = find_gm_exceeding_triangles(index, ntriangles)
+        print_entries(index, sys.stdout)
+
+    else:
+        sys.stderr.write('Wrong syntax. Usage: \n{} [-t <texture>] [-n <triangles>] <file.gm or resource folder> [...]\n'.format(sys.argv[0]))
+        sys.exit(2)
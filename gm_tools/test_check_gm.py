@@ -0,0 +1,115 @@
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from check_gm import (
+    FLAGS_BSP_PRESENT,
+    check_gm,
+    header_dtype,
+    material_dtype,
+    object_dtype,
+    vertex_buffer_dtype,
+)
+
+
+def make_gm(flags=0, trailing=b'', texture=None, object_fields=None, vertex_buffer_size=3 * 36, triangles=(0, 1, 2)):
+    # one material, one object with a single triangle over three type 0 vertices
+    names = b'a\0'
+    textures = numpy.array([], dtype="<i4")
+    if texture is not None:
+        textures = numpy.array([len(names)], dtype="<i4")
+        names += texture.encode() + b'\0'
+
+    header = numpy.zeros(1, dtype=header_dtype)
+    header["flags"] = flags
+    header["nameSize"] = len(names)
+    header["namesQuantity"] = 1
+    header["ntextures"] = len(textures)
+    header["nmaterials"] = 1
+    header["nobjects"] = 1
+    header["ntriangles"] = 1
+    header["nvrtbuffs"] = 1
+
+    material = numpy.zeros(1, dtype=material_dtype)
+    material["texture"] = -1
+    if texture is not None:
+        material["texture"][0, 0] = 0
+
+    object = numpy.zeros(1, dtype=object_dtype)
+    object["ntriangles"] = 1
+    object["nvertices"] = 3
+    for field, value in (object_fields or {}).items():
+        object[field] = value
+
+    triangles = numpy.array(triangles, dtype="<u2")
+
+    vertex_buffer = numpy.zeros(1, dtype=vertex_buffer_dtype)
+    vertex_buffer["size"] = vertex_buffer_size
+
+    return b''.join([
+        header.tobytes(),
+        names,
+        numpy.array([0], dtype="<i4").tobytes(),
+        textures.tobytes(),
+        material.tobytes(),
+        object.tobytes(),
+        triangles.tobytes(),
+        vertex_buffer.tobytes(),
+        bytes(vertex_buffer_size),
+        trailing,
+    ])
+
+
+def write_gm(tmp_path, data):
+    file_path = os.path.join(str(tmp_path), 'model.gm')
+    with open(file_path, mode='wb') as file:
+        file.write(data)
+    return file_path
+
+
+def test_valid_file(tmp_path):
+    assert check_gm(write_gm(tmp_path, make_gm())) == []
+
+
+def test_trailing_bytes_without_bsp_flag(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(trailing=bytes(64))))
+    assert errors == ['64 trailing bytes after vertex data']
+
+
+def test_bsp_block_after_vertex_data(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(flags=FLAGS_BSP_PRESENT, trailing=bytes(64))))
+    assert errors == []
+
+
+def test_truncated_vertex_data_with_bsp_flag(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(flags=FLAGS_BSP_PRESENT)[:-8]))
+    assert len(errors) == 1
+    assert errors[0].startswith('vertex data ends at')
+
+
+def test_name_offset_outside_name_table(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(object_fields={"name": 2})))
+    assert errors == ['object 0: name offset outside of name table (2 bytes)']
+
+
+def test_vertex_buffer_size_not_multiple_of_stride(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(vertex_buffer_size=3 * 36 + 4)))
+    assert errors == ['vertex buffer 0: size is not a multiple of stride']
+
+
+def test_object_vertices_past_vertex_buffer(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(object_fields={"svertex": 1})))
+    assert errors == ['object 0: svertex/nvertices range does not fit its vertex buffer']
+
+
+def test_object_triangles_past_triangle_table(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(object_fields={"striangle": 1})))
+    assert errors == ['object 0: striangle/ntriangles range does not fit 1 triangles']
+
+
+def test_triangle_index_beyond_nvertices(tmp_path):
+    errors = check_gm(write_gm(tmp_path, make_gm(triangles=(0, 1, 3))))
+    assert errors == ['object 0: 1 triangles index vertices beyond nvertices=3']
@@ -0,0 +1,38 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from check_gm import FLAGS_BSP_PRESENT
+from scan_gm import find_gm_exceeding_triangles, find_gm_using_texture, scan_gm, scan_gm_tree
+from test_check_gm import make_gm, write_gm
+
+
+def test_scan_reads_tables(tmp_path):
+    entry = scan_gm(write_gm(tmp_path, make_gm(texture='ships\\brig\\deck.tga.tx')))
+    assert entry["ntriangles"] == 1
+    assert entry["nvertices"] == 3
+    assert entry["textures"] == ['ships\\brig\\deck.tga.tx']
+    assert entry["materials"][0]["textureNames"] == ['ships\\brig\\deck.tga.tx']
+    assert entry["objects"][0]["material"] == 'a'
+
+
+def test_scan_ignores_bsp_block(tmp_path):
+    entry = scan_gm(write_gm(tmp_path, make_gm(flags=FLAGS_BSP_PRESENT, trailing=bytes(64))))
+    assert entry["ntriangles"] == 1
+
+
+def test_find_in_tree(tmp_path):
+    for name, texture in (('deck.gm', 'ships\\brig\\deck.tga.tx'), ('hull.gm', 'ships/brig/hull.tga')):
+        with open(os.path.join(str(tmp_path), name), mode='wb') as file:
+            file.write(make_gm(texture=texture))
+    with open(os.path.join(str(tmp_path), 'broken.gm'), mode='wb') as file:
+        file.write(make_gm()[:20])
+
+    index = scan_gm_tree([str(tmp_path)], io.StringIO())
+    assert len(index) == 2
+    found = find_gm_using_texture(index, 'DECK.tga')
+    assert [os.path.basename(entry["path"]) for entry in found] == ['deck.gm']
+    assert find_gm_exceeding_triangles(index, 0) == index
+    assert find_gm_exceeding_triangles(index, 1) == []
@@ -1,15 +1,22 @@
+import hashlib
+import json
 import math
+import mmap
 import os
 import struct
+import sys
 import time
+import zipfile
 
-import bmesh
 import bpy
 import mathutils
-from bpy.props import IntProperty, BoolProperty, EnumProperty, StringProperty
-from bpy.types import Operator
+import numpy
+from bpy.props import IntProperty, BoolProperty, CollectionProperty, EnumProperty, StringProperty
+from bpy.types import Operator, OperatorFileListElement
 from bpy_extras.io_utils import ImportHelper, axis_conversion
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 bl_info = {
@@ -430,112 +437,93 @@ potc_to_coas_man = {value: key for key, value in coas_to_potc_man.items()}
 
 potc_to_coas_woman = {value: key for key, value in coas_to_potc_woman.items()}
 
-# taken from Copy Attributes Menu Addon by Bassam Kurdali, Fabian Fricke, Adam Wiseman
-def getmat(bone, active, context, ignoreparent):
-    obj_bone = bone.id_data
-    obj_active = active.id_data
-    data_bone = obj_bone.data.bones[bone.name]
-
-    active_to_selected = obj_bone.matrix_world.inverted() @ obj_active.matrix_world
-    active_matrix = active_to_selected @ active.matrix
-    otherloc = active_matrix
-    bonemat_local = data_bone.matrix_local.copy()
-    if data_bone.parent:
-        parentposemat = obj_bone.pose.bones[data_bone.parent.name].matrix.copy(
-        )
-        parentbonemat = data_bone.parent.matrix_local.copy()
-    else:
-        parentposemat = parentbonemat = mathutils.Matrix()
-    if parentbonemat == parentposemat or ignoreparent:
-        newmat = bonemat_local.inverted() @ otherloc
-    else:
-        bonemat = parentbonemat.inverted() @ bonemat_local
-
-        newmat = bonemat.inverted() @ parentposemat.inverted() @ otherloc
-    return newmat
-
-
-def read_vector(file):
-    x = struct.unpack("<f", file.read(4))[0]
-    y = struct.unpack("<f", file.read(4))[0]
-    z = struct.unpack("<f", file.read(4))[0]
-    return [x, y, z]
-
-
-def read_d3dx_quaternion(file):
-    x = struct.unpack("<f", file.read(4))[0]
-    y = struct.unpack("<f", file.read(4))[0]
-    z = struct.unpack("<f", file.read(4))[0]
-    w = struct.unpack("<f", file.read(4))[0]
-    return [w, x, y, z]
-
-
-def read_color(file):
-    r = struct.unpack("<B", file.read(1))[0]
-    g = struct.unpack("<B", file.read(1))[0]
-    b = struct.unpack("<B", file.read(1))[0]
-    a = struct.unpack("<B", file.read(1))[0]
-    return [r/255, g/255, b/255, a/255]
-
+# conversion name: (bone map, bone for ids missing from the map, -1 drops them)
+skeleton_conversions = {
+    'coas_to_potc_man': (coas_to_potc_man, 16),
+    'coas_to_potc_woman': (coas_to_potc_woman, 16),
+    'potc_to_coas_man': (potc_to_coas_man, -1),
+    'potc_to_coas_woman': (potc_to_coas_woman, -1),
+    'jess_to_woman': (jess_to_woman, -1),
+    'woman_to_danny': (woman_to_danny, -1),
+    'jess_to_danny': (jess_to_danny, -1),
+}
 
-def read_vertex0(file):
-    pos = read_vector(file)
-    norm = read_vector(file)
-    color = read_color(file)
+# GM vertices keep bone ids in a byte
+MAX_BONES = 256
 
-    tu0 = struct.unpack("<f", file.read(4))[0]
-    tv0 = struct.unpack("<f", file.read(4))[0]
 
-    return {
-        "pos": pos,
-        "norm": norm,
-        "color": color,
-        "tu0": tu0,
-        "tv0": tv0,
-    }
+def compile_bone_map(bone_map, missing=-1):
+    table = numpy.full(MAX_BONES, missing, dtype=numpy.int32)
+    for key, value in bone_map.items():
+        table[int(key)] = int(value)
+    return table
 
 
-def read_vertex1(file):
-    pos = read_vector(file)
-    norm = read_vector(file)
-    color = read_color(file)
+bone_remap_tables = {name: compile_bone_map(*conversion) for name, conversion in skeleton_conversions.items()}
 
-    tu0 = struct.unpack("<f", file.read(4))[0]
-    tv0 = struct.unpack("<f", file.read(4))[0]
 
-    tu1 = struct.unpack("<f", file.read(4))[0]
-    tv1 = struct.unpack("<f", file.read(4))[0]
+def get_bone_remap_table(conversions):
+    # conversions are chained in the given order, e.g. ('jess_to_woman', 'woman_to_danny')
+    if len(conversions) == 0:
+        return None
 
-    return {
-        "pos": pos,
-        "norm": norm,
-        "color": color,
-        "tu0": tu0,
-        "tv0": tv0,
-        "tu1": tu1,
-        "tv1": tv1,
-    }
+    table = numpy.arange(MAX_BONES, dtype=numpy.int32)
+    for name in conversions:
+        table = numpy.where(table >= 0, bone_remap_tables[name][table.clip(min=0)], -1).astype(numpy.int32)
+    return table
 
 
-def read_avertex0(file):
-    pos = read_vector(file)
-    weight = struct.unpack("<f", file.read(4))[0]
-    bone_id = struct.unpack("<L", file.read(4))[0]
-    norm = read_vector(file)
-    color = read_color(file)
+def read_vector(file):
+    x = struct.unpack("<f", file.read(4))[0]
+    y = struct.unpack("<f", file.read(4))[0]
+    z = struct.unpack("<f", file.read(4))[0]
+    return [x, y, z]
 
-    tu0 = struct.unpack("<f", file.read(4))[0]
-    tv0 = struct.unpack("<f", file.read(4))[0]
 
-    return {
-        "pos": pos,
-        "weight": weight,
-        "boneId": bone_id,
-        "norm": norm,
-        "color": color,
-        "tu0": tu0,
-        "tv0": tv0,
-    }
+label_dtype = numpy.dtype([
+    ("groupName", "<i4"),
+    ("name", "<i4"),
+    ("flags", "<i4"),
+    ("m", "<f4", (4, 4)),
+    ("bones", "<i4", (4,)),
+    ("weight", "<f4", (4,)),
+])
+
+
+def get_name_index(globname, names_offsets=()):
+    # offset -> name for every NUL terminated string of the name table, split in one pass
+    try:
+        globname.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError as error:
+        encoding = "cp1251"
+
+    names = {}
+    offset = 0
+    for name in globname.split(b'\0'):
+        names[offset] = sys.intern(name.decode(encoding))
+        offset += len(name) + 1
+
+    # offsets pointing into the middle of a name
+    for offset in names_offsets:
+        if offset not in names and 0 <= offset < len(globname):
+            end = globname.find(b'\0', offset)
+            names[offset] = sys.intern(globname[offset:end if end >= 0 else len(globname)].decode(encoding))
+
+    return names
+
+
+def get_vertex_dtype(vertex_type):
+    # layout of one vertex, matches stride 36 + (type & 3) * 8 + (type >> 2) * 8
+    fields = [("pos", "<f4", (3,))]
+    if vertex_type >> 2:
+        fields += [("weight", "<f4"), ("boneId", "<u4")]
+    fields += [
+        ("norm", "<f4", (3,)),
+        ("color", "u1", (4,)),
+        ("uv", "<f4", (1 + (vertex_type & 3), 2)),
+    ]
+    return numpy.dtype(fields)
 
 
 def get_unique_name(name, s):
@@ -551,8 +539,28 @@ def get_unique_name(name, s):
             return alias
         num += 1
 
-def parse_gm(file_path="", report_func=None):
-    with open(file_path, mode='rb') as file:
+class GmReader:
+    """Memory-mapped GM file.
+
+    The header and the name, texture, material, label and object tables are
+    parsed on open; vertex and triangle data is copied out of the mapping only
+    when an object asks for it, so no view outlives close().
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, mode='rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_tables()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_tables(self):
+        file = self._data
+
         header_version = struct.unpack("<l", file.read(4))[0]
         header_flags = struct.unpack("<l", file.read(4))[0]
         header_name_size = struct.unpack("<l", file.read(4))[0]
@@ -568,40 +576,41 @@ def parse_gm(file_path="", report_func=None):
         header_bboxCenter = read_vector(file)
         header_radius = struct.unpack("<f", file.read(4))[0]
 
-        globname = file.read(header_name_size)
+        self.header = {
+            "version": header_version,
+            "flags": header_flags,
+            "nameSize": header_name_size,
+            "namesQuantity": header_names_quantity,
+            "ntextures": header_ntextures,
+            "nmaterials": header_nmaterials,
+            "nlights": header_nlights,
+            "nlabels": header_nlabels,
+            "nobjects": header_nobjects,
+            "ntriangles": header_ntriangles,
+            "nvrtbuffs": header_nvrtbuffs,
+            "bboxSize": header_bboxSize,
+            "bboxCenter": header_bboxCenter,
+            "radius": header_radius,
+        }
 
-        try:
-            globname = globname.decode("utf-8")
-        except UnicodeDecodeError as error:
-            globname = globname.decode("cp1251")
+        globname = file.read(header_name_size)
 
-        names_offsets = []
-        for i in range(header_names_quantity):
-            offset = struct.unpack("<l", file.read(4))[0]
-            names_offsets.append(offset)
+        # copied out, a view left in the frame of a failed open would keep close() from unmapping
+        names_offsets = numpy.frombuffer(file, dtype="<i4", count=header_names_quantity, offset=file.tell()).tolist()
+        file.seek(header_names_quantity * 4, os.SEEK_CUR)
 
-        names = {}
-        for i in range(header_names_quantity):
-            offset = names_offsets[i]
-            next_offset = header_name_size if i == header_names_quantity - \
-                1 else names_offsets[i + 1]
-            names[offset] = globname[offset:next_offset].replace('\0', '')
+        names = get_name_index(globname, names_offsets)
+        self.names = names
 
         texture_names_offsets = []
         for i in range(header_ntextures):
             offset = struct.unpack("<l", file.read(4))[0]
             texture_names_offsets.append(offset)
 
-        print("\nUsed textures:\n")
-        if report_func:
-            report_func({'INFO'}, "Used textures:")
         texture_names = []
         for offset in texture_names_offsets:
-            texture_name = names[offset]
-            print(texture_name)
-            if report_func:
-                report_func({'INFO'}, texture_name)
-            texture_names.append(texture_name)
+            texture_names.append(names[offset])
+        self.texture_names = texture_names
 
         materials = []
         material_names = set()
@@ -630,7 +639,6 @@ def parse_gm(file_path="", report_func=None):
                     material_texture_names.append(texture_names[idx])
 
             material_name_alias = get_unique_name(material_name, material_names)
-            get_unique_name
             materials.append({
                 "groupName": material_group_name,
                 "name": material_name_alias,
@@ -642,37 +650,27 @@ def parse_gm(file_path="", report_func=None):
                 "texture": material_texture,
                 "textureNames": material_texture_names,
             })
+        self.materials = materials
 
-        labels = []
-        for i in range(header_nlabels):
-            label_group_name_idx = struct.unpack("<l", file.read(4))[0]
-            label_group_name = names.get(label_group_name_idx)
-            label_name_idx = struct.unpack("<l", file.read(4))[0]
-            label_name = names.get(label_name_idx)
-            label_flags = struct.unpack("<l", file.read(4))[0]
-
-            label_m = []
-            for i in range(4):
-                label_m.append([])
-                for j in range(4):
-                    label_m[i].append(struct.unpack("<f", file.read(4))[0])
-
-            label_bones = []
-            for i in range(4):
-                label_bones.append(struct.unpack("<l", file.read(4))[0])
+        label_table = numpy.frombuffer(file, dtype=label_dtype, count=header_nlabels, offset=file.tell()).copy()
+        file.seek(label_dtype.itemsize * header_nlabels, os.SEEK_CUR)
 
-            label_weight = []
-            for i in range(4):
-                label_weight.append(struct.unpack("<f", file.read(4))[0])
+        self.label_matrices = label_table["m"]
+        label_bones = label_table["bones"]
+        label_weights = label_table["weight"]
 
-            labels.append(({
-                "groupName": label_group_name,
-                "name": label_name,
+        labels = []
+        for i, (label_group_name_idx, label_name_idx, label_flags) in enumerate(zip(
+                label_table["groupName"].tolist(), label_table["name"].tolist(), label_table["flags"].tolist())):
+            labels.append({
+                "groupName": names.get(label_group_name_idx),
+                "name": names.get(label_name_idx),
                 "flags": label_flags,
-                "m": label_m,
-                "bones": label_bones,
-                "weight": label_weight,
-            }))
+                "m": self.label_matrices[i],
+                "bones": label_bones[i],
+                "weight": label_weights[i],
+            })
+        self.labels = labels
 
         objects = []
         for i in range(header_nobjects):
@@ -716,14 +714,11 @@ def parse_gm(file_path="", report_func=None):
                 "bones": object_bones,
                 "atriangles": object_atriangles,
             })
+        self.objects = objects
 
-        triangles = []
-        for i in range(header_ntriangles):
-            triangles.append([
-                struct.unpack("<H", file.read(2))[0],
-                struct.unpack("<H", file.read(2))[0],
-                struct.unpack("<H", file.read(2))[0]
-            ])
+        # triangles are skipped here and sliced per object
+        self._triangles_offset = file.tell()
+        file.seek(header_ntriangles * 6, os.SEEK_CUR)
 
         vertex_buffers = []
         for i in range(header_nvrtbuffs):
@@ -731,7 +726,7 @@ def parse_gm(file_path="", report_func=None):
             vertex_buffer_size = struct.unpack("<l", file.read(4))[0]
 
             vertex_buffer_stride = 36 + (vertex_buffer_type & 3) * 8 + (vertex_buffer_type >> 2) * 8
-            vertex_buffer_nverts = vertex_buffer_size / vertex_buffer_stride
+            vertex_buffer_nverts = vertex_buffer_size // vertex_buffer_stride
 
             vertex_buffers.append({
                 "type": vertex_buffer_type,
@@ -740,35 +735,197 @@ def parse_gm(file_path="", report_func=None):
                 "nverts": vertex_buffer_nverts,
             })
 
-        vertices = []
-        for i in range(header_nvrtbuffs):
-            vertices.append([])
-            current_vertex_buffer = vertex_buffers[i]
-            for j in range(int(current_vertex_buffer.get("nverts"))):
-                vertex_type = current_vertex_buffer.get("type")
-                if vertex_type == 0:
-                    vertices[i].append(read_vertex0(file))
-                if vertex_type == 1:
-                    vertices[i].append(read_vertex1(file))
-                if vertex_type == 4:
-                    vertices[i].append(read_avertex0(file))
+        # vertex data follows the buffer headers, one buffer after another
+        vertex_buffer_offset = file.tell()
+        for vertex_buffer in vertex_buffers:
+            vertex_buffer["offset"] = vertex_buffer_offset
+            vertex_buffer_offset += vertex_buffer.get("size")
+        self.vertex_buffers = vertex_buffers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._data is None:
+            return
+        self._data.close()
+        self._data = None
+
+    def get_object_vertex_buffer(self, object):
+        return self.vertex_buffers[object.get("vertexBuff")]
+
+    def get_object_vertices(self, object):
+        vertex_buffer = self.get_object_vertex_buffer(object)
+        vertex_buffer_type = vertex_buffer.get("type")
+        vertex_dtype = get_vertex_dtype(vertex_buffer_type)
+        if vertex_dtype.itemsize != vertex_buffer.get("stride"):
+            raise ValueError('Unsupported vertex buffer type {}'.format(vertex_buffer_type))
+
+        object_nvertices = object.get("nvertices")
+        object_svertex = object.get("svertex")
+        if object_svertex + object_nvertices > vertex_buffer.get("nverts"):
+            raise ValueError('Object "{}" is out of its vertex buffer'.format(object.get("name")))
+
+        return numpy.frombuffer(
+            self._data,
+            dtype=vertex_dtype,
+            count=object_nvertices,
+            offset=vertex_buffer.get("offset") + object_svertex * vertex_dtype.itemsize
+        ).copy()
+
+    def get_object_triangles(self, object):
+        object_ntriangles = object.get("ntriangles")
+        object_striangle = object.get("striangle")
+        if object_striangle + object_ntriangles > self.header.get("ntriangles"):
+            raise ValueError('Object "{}" is out of the triangle buffer'.format(object.get("name")))
+
+        return numpy.frombuffer(
+            self._data,
+            dtype="<u2",
+            count=object_ntriangles * 3,
+            offset=self._triangles_offset + object_striangle * 6
+        ).reshape(-1, 3).copy()
+
+
+class GmObject:
+    __slots__ = (
+        "name",
+        "vertices",
+        "normals",
+        "uv",
+        "uv_normals",
+        "colors",
+        "weights",
+        "bone_ids",
+        "faces",
+        "material",
+    )
+
+    def __init__(self, name, vertices, normals, uv, uv_normals, colors, weights, bone_ids, faces, material):
+        self.name = name
+        self.vertices = vertices
+        self.normals = normals
+        self.uv = uv
+        self.uv_normals = uv_normals
+        self.colors = colors
+        self.weights = weights
+        self.bone_ids = bone_ids
+        self.faces = faces
+        self.material = material
+
+
+def get_texture_file_name(texture_name):
+    texture_file = texture_name.split('\\')[-1]
+    texture_file = texture_file.split('/')[-1]
+    if texture_file.endswith('.tga.tx'):
+        texture_file = texture_file[:-3]
+    return texture_file
+
+
+TEXTURE_INDEX_CHECK_INTERVAL = 2.0
+
+
+class TextureResolver:
+    def __init__(self, textures_path):
+        self.textures_path = textures_path
+        self.files = {}
+        self.dirs = {}
+        self.dir_mtimes = {}
+        self.resolved = {}
+        self.checked_at = 0.0
+
+        # one walk instead of an rglob per lookup; same visiting order as rglob
+        for (dirpath, dirnames, filenames) in os.walk(textures_path or os.curdir):
+            self.dir_mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+            for dirname in dirnames:
+                self.dirs.setdefault(os.path.normcase(dirname), []).append(os.path.join(dirpath, dirname))
+            for filename in filenames:
+                self.files.setdefault(os.path.normcase(filename), []).append(os.path.join(dirpath, filename))
+        self.checked_at = time.monotonic()
+
+    def is_stale(self):
+        now = time.monotonic()
+        if now - self.checked_at < TEXTURE_INDEX_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+
+        for (dirpath, mtime) in self.dir_mtimes.items():
+            try:
+                if os.stat(dirpath).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def find(self, ship_name, hull_num, texture_file):
+        key = (ship_name, hull_num, texture_file)
+        if key not in self.resolved:
+            self.resolved[key] = self.lookup(ship_name, hull_num, texture_file)
+        return self.resolved[key]
+
+    def lookup(self, ship_name, hull_num, texture_file):
+        candidates = self.files.get(os.path.normcase(texture_file), [])
+        ship_dirs = self.dirs.get(os.path.normcase(ship_name), [])
+        hull_dirs = ([f'hull{hull_num}',] if hull_num is not None else []) + ['hull1']
+
+        # <ship>/hull<N>/<texture>, then <ship>/hull1/<texture>
+        candidate_keys = {os.path.normcase(candidate) for candidate in candidates}
+        for ship_dir in ship_dirs:
+            for hull_dir in hull_dirs:
+                texture_path = os.path.join(ship_dir, hull_dir, texture_file)
+                if os.path.normcase(texture_path) in candidate_keys:
+                    return texture_path
+
+        # anywhere inside the ship folder
+        for ship_dir in ship_dirs:
+            prefix = os.path.normcase(os.path.join(ship_dir, ''))
+            for candidate in candidates:
+                if os.path.normcase(candidate).startswith(prefix):
+                    return candidate
+
+        # anywhere inside the textures folder
+        if len(candidates) > 0:
+            return candidates[0]
+
+        return None
+
+
+texture_resolvers = {}
+
+
+def get_texture_resolver(textures_path):
+    resolver = texture_resolvers.get(textures_path)
+    if resolver is None or resolver.is_stale():
+        resolver = TextureResolver(textures_path)
+        texture_resolvers[textures_path] = resolver
+    return resolver
+
+
+def parse_gm(file_path="", report_func=None):
+    with GmReader(file_path) as reader:
+        texture_names = reader.texture_names
+        textures_summary = 'Used textures ({}): {}'.format(len(texture_names), ', '.join(texture_names))
+        print(textures_summary)
+        if report_func:
+            report_func({'INFO'}, textures_summary)
+
+        materials = reader.materials
+        labels = reader.labels
 
         # prepare data for blender
         prepared_objects = []
         x_is_mirrored = False
         is_animated = False
 
-        for object in objects:
+        for object in reader.objects:
             object_name = object.get("name")
-            object_vertex_buff = object.get("vertexBuff")
-            object_ntriangles = object.get("ntriangles")
-            object_striangle = object.get("striangle")
-            object_nvertices = object.get("nvertices")
-            object_svertex = object.get("svertex")
             object_material_idx = object.get("material")
 
-            object_vertex_buffer = vertices[object_vertex_buff][object_svertex:object_svertex + object_nvertices]
-            object_type = vertex_buffers[object_vertex_buff].get("type")
+            object_vertex_buffer = reader.get_object_vertices(object)
+            object_type = reader.get_object_vertex_buffer(object).get("type")
 
             is_animated = object_type == 4
             x_is_mirrored = not is_animated
@@ -778,69 +935,48 @@ def parse_gm(file_path="", report_func=None):
             object_material_name = object_material.get("name")
             object_texture_names = object_material.get("textureNames")
 
-            object_vertices = []
-            for buffer in object_vertex_buffer:
-                [x, y, z] = buffer.get("pos")
-                x = -x if x_is_mirrored else x
-                object_vertices.append([x, y, z])
-
-            object_normals = []
-            for buffer in object_vertex_buffer:
-                [x, y, z] = buffer.get("norm")
-                x = -x if x_is_mirrored else x
-                object_normals.append([x, y, z])
-
-            object_uv = []
-            for buffer in object_vertex_buffer:
-                tu0 = buffer.get("tu0")
-                tv0 = buffer.get("tv0")
-                object_uv.append([tu0, -tv0])
-
-            object_uv_normals = []
-            for buffer in object_vertex_buffer:
-                tu1 = buffer.get("tu1")
-                tv1 = buffer.get("tv1")
-                if tu1 is not None:
-                    object_uv_normals.append([tu1, -tv1])
-            object_uv_normals = object_uv_normals if len(object_uv_normals) > 0 else None
-
-            object_colors = []
-            for buffer in object_vertex_buffer:
-                object_colors.append(buffer.get("color"))
-
-            object_weights = []
-            if is_animated:
-                for buffer in object_vertex_buffer:
-                    object_weights.append(buffer.get("weight"))
+            object_vertices = object_vertex_buffer["pos"].astype(numpy.float32)
+            object_normals = object_vertex_buffer["norm"].astype(numpy.float32)
+            if x_is_mirrored:
+                object_vertices[:, 0] *= -1
+                object_normals[:, 0] *= -1
 
-            object_bone_ids = []
-            if is_animated:
-                for buffer in object_vertex_buffer:
-                    object_bone_id = buffer.get("boneId")
-                    object_firstBoneId = object_bone_id & 0xff
-                    object_secondBoneId = (object_bone_id >> 8) & 0xff
-                    object_bone_ids.append([object_firstBoneId, object_secondBoneId])
+            object_uv_sets = object_vertex_buffer["uv"].astype(numpy.float32)
+            object_uv_sets[:, :, 1] *= -1
+            object_uv = object_uv_sets[:, 0]
+            object_uv_normals = None
+            if object_uv_sets.shape[1] > 1 and len(object_uv_sets) > 0:
+                object_uv_normals = object_uv_sets[:, 1]
 
-            object_faces = []
-            for [v1, v2, v3] in triangles[object_striangle:object_striangle + object_ntriangles]:
-                object_faces.append([v2, v1, v3])  # opposite
+            # kept as bytes, converted to float when written to the mesh
+            object_colors = numpy.ascontiguousarray(object_vertex_buffer["color"])
 
-            prepared_objects.append({
-                "name": object_name,
-                "verticies": object_vertices,
-                "normals": object_normals,
-                "uv": object_uv,
-                "uvNormals": object_uv_normals,
-                "colors": object_colors,
-                "weights": object_weights,
-                "boneIds": object_bone_ids,
-                "faces": object_faces,
-                "material": {
+            object_weights = None
+            object_bone_ids = None
+            if is_animated:
+                object_weights = object_vertex_buffer["weight"].astype(numpy.float32)
+                object_bone_id = object_vertex_buffer["boneId"]
+                object_bone_ids = numpy.stack(
+                    [object_bone_id & 0xff, (object_bone_id >> 8) & 0xff], axis=1).astype(numpy.int32)
+
+            object_faces = reader.get_object_triangles(object)[:, [1, 0, 2]]  # opposite
+
+            prepared_objects.append(GmObject(
+                object_name,
+                object_vertices,
+                object_normals,
+                object_uv,
+                object_uv_normals,
+                object_colors,
+                object_weights,
+                object_bone_ids,
+                object_faces,
+                {
                     "groupName": object_material_group_name,
                     "name": object_material_name,
                     "textureNames": object_texture_names,
                 }
-            })
+            ))
 
         locators_trees = {}
         for label in labels:
@@ -865,7 +1001,7 @@ def parse_gm(file_path="", report_func=None):
             locators_trees[label_group_name].append({
                 "name": label_name,
                 "m": label_m,
-                "boneIdx": label_bones[0]
+                "boneIdx": int(label_bones[0])
             })
 
     return {
@@ -876,6 +1012,135 @@ def parse_gm(file_path="", report_func=None):
     }
 
 
+GM_CACHE_SIZE = 32
+GM_CACHE_VERSION = 2
+
+# parsed GM data, keyed by (path, size, mtime)
+gm_cache = OrderedDict()
+
+
+def get_gm_cache_key(file_path):
+    stat = os.stat(file_path)
+    return (os.path.normcase(os.path.abspath(file_path)), stat.st_size, stat.st_mtime_ns)
+
+
+def freeze_gm_data(data):
+    # cached arrays are shared between imports, nobody may change them in place
+    for object in data.get("objects"):
+        for attr in GmObject.__slots__:
+            value = getattr(object, attr)
+            if isinstance(value, numpy.ndarray):
+                value.flags.writeable = False
+    return data
+
+
+def get_gm_cache_file(cache_path, key):
+    digest = hashlib.sha1(key[0].encode("utf-8")).hexdigest()
+    return os.path.join(cache_path, digest + ".npz")
+
+
+def write_gm_cache_file(cache_file, key, data):
+    arrays = {}
+    objects_meta = []
+    for i, object in enumerate(data.get("objects")):
+        arrays_names = []
+        for attr in ("vertices", "normals", "uv", "uv_normals", "colors", "weights", "bone_ids", "faces"):
+            value = getattr(object, attr)
+            if value is not None:
+                arrays["{}_{}".format(i, attr)] = value
+                arrays_names.append(attr)
+        objects_meta.append({
+            "name": object.name,
+            "material": object.material,
+            "arrays": arrays_names,
+        })
+
+    locators_trees = {}
+    for group_name, locators in data.get("locatorsTrees").items():
+        locators_trees[group_name] = [{
+            "name": locator.get("name"),
+            "m": numpy.asarray(locator.get("m")).tolist(),
+            "boneIdx": int(locator.get("boneIdx")),
+        } for locator in locators]
+
+    meta = {
+        "version": GM_CACHE_VERSION,
+        "key": list(key),
+        "objects": objects_meta,
+        "locatorsTrees": locators_trees,
+        "xIsMirrored": data.get("xIsMirrored"),
+        "isAnimated": data.get("isAnimated"),
+    }
+    arrays["meta"] = numpy.array(json.dumps(meta))
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, mode='wb') as file:
+        numpy.savez(file, **arrays)
+    os.replace(tmp_file, cache_file)
+
+
+def read_gm_cache_file(cache_file, key):
+    if not os.path.isfile(cache_file):
+        return None
+
+    with numpy.load(cache_file, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["meta"]))
+        if meta.get("version") != GM_CACHE_VERSION or tuple(meta.get("key")) != key:
+            return None
+
+        objects = []
+        for i, object_meta in enumerate(meta.get("objects")):
+            values = {attr: None for attr in GmObject.__slots__}
+            for attr in object_meta.get("arrays"):
+                values[attr] = npz["{}_{}".format(i, attr)]
+            values["name"] = object_meta.get("name")
+            values["material"] = object_meta.get("material")
+            objects.append(GmObject(**values))
+
+    return {
+        "objects": objects,
+        "locatorsTrees": meta.get("locatorsTrees"),
+        "xIsMirrored": meta.get("xIsMirrored"),
+        "isAnimated": meta.get("isAnimated"),
+    }
+
+
+def load_gm(file_path="", report_func=None, cache_path=""):
+    key = get_gm_cache_key(file_path)
+
+    data = gm_cache.get(key)
+    if data is not None:
+        gm_cache.move_to_end(key)
+        return data
+
+    cache_file = get_gm_cache_file(cache_path, key) if cache_path else None
+    if cache_file is not None:
+        try:
+            data = read_gm_cache_file(cache_file, key)
+        except (OSError, ValueError, KeyError, TypeError, EOFError, zipfile.BadZipFile) as error:
+            # a broken entry is parsed again and overwritten below
+            print('Warning: ignoring GM cache "{}": {}'.format(cache_file, error))
+
+    if data is None:
+        data = parse_gm(file_path, report_func)
+        if cache_file is not None:
+            try:
+                write_gm_cache_file(cache_file, key, data)
+            except OSError as error:
+                print('Warning: can\'t write GM cache "{}": {}'.format(cache_file, error))
+
+    # older versions of the same file are of no use anymore
+    for stale_key in [k for k in gm_cache if k[0] == key[0]]:
+        del gm_cache[stale_key]
+
+    gm_cache[key] = freeze_gm_data(data)
+    while len(gm_cache) > GM_CACHE_SIZE:
+        gm_cache.popitem(last=False)
+
+    return data
+
+
 def parse_an(file_path=""):
     with open(file_path, mode='rb') as file:
         frames_quantity = struct.unpack("<l", file.read(4))[0]
@@ -902,19 +1167,16 @@ def parse_an(file_path=""):
                 [dX, dY, dZ] = blender_start_joints_positions[parent_indices[i]]
                 blender_start_joints_positions.append([x + dX, y + dY, z + dZ])
 
-        root_bone_positions = []
-        [root_start_x, root_start_y, root_start_z] = start_joints_positions[0]
-        for i in range(frames_quantity):
-            [x, y, z] = read_vector(file)
-            root_bone_positions.append(
-                [x - root_start_x, y - root_start_y, z - root_start_z])
+        # frame tables are read in bulk, per-float unpacks dominate on long animations
+        root_bone_positions = numpy.frombuffer(
+            file.read(frames_quantity * 12), dtype="<f4").reshape(frames_quantity, 3).astype(numpy.float64)
+        root_bone_positions -= start_joints_positions[0]
+        root_bone_positions = root_bone_positions.tolist()
 
-        joints_angles = []
-        for i in range(joints_quantity):
-            joints_angles.append([])
-            for j in range(frames_quantity):
-                d3dx_quaternion = read_d3dx_quaternion(file)
-                joints_angles[i].append(d3dx_quaternion)
+        # D3DX stores x, y, z, w; blender wants w first
+        joints_angles = numpy.frombuffer(
+            file.read(joints_quantity * frames_quantity * 16), dtype="<f4").reshape(joints_quantity, frames_quantity, 4)
+        joints_angles = joints_angles[:, :, [3, 0, 1, 2]].astype(numpy.float64).tolist()
 
     return {
         "header": {
@@ -930,9 +1192,23 @@ def parse_an(file_path=""):
     }
 
 
-def get_armature_obj(file_path, collection, type='', fix_coas_man_head=False):
-    file_name = os.path.basename(file_path)[:-3]
+an_cache = {}
+
+
+def load_an(file_path):
+    # skeletons are shared by most models of a folder, parse each one once while it stays unchanged
+    key = get_gm_cache_key(file_path)
+    entry = an_cache.get(key[0])
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
     data = parse_an(file_path)
+    an_cache[key[0]] = (key, data)
+    return data
+
+
+def get_armature_obj(file_path, collection, data, fix_coas_man_head=False):
+    file_name = os.path.basename(file_path)[:-3]
 
     header = data.get('header')
     frames_quantity = header.get('nFrames')
@@ -954,18 +1230,6 @@ def get_armature_obj(file_path, collection, type='', fix_coas_man_head=False):
     armature_obj = bpy.data.objects.new('armature_obj', armature)
     collection.objects.link(armature_obj)
 
-    animation_data = armature_obj.animation_data_create()
-    
-    
-    
-    action = bpy.data.actions.new(name="Joints_action")
-    animation_data.action = action
-    slot = action.slots.new(id_type='OBJECT', name="Joints_slot")
-    layer = action.layers.new("Layer")
-    animation_data.action_slot = slot
-    strip = layer.strips.new(type='KEYFRAME')
-    channelbag = strip.channelbag(slot, ensure=True)
-
     armature_obj.data.display_type = 'STICK'
 
     bpy.context.view_layer.objects.active = armature_obj
@@ -1007,17 +1271,14 @@ def get_armature_obj(file_path, collection, type='', fix_coas_man_head=False):
 
     bpy.ops.object.mode_set(mode='POSE', toggle=False)
 
-    if type == 'POSE_SOURCE':
-        return armature_obj
-
-    if type == 'POSE':
-        for bone_idx in range(joints_quantity):
-            bone = armature_obj.pose.bones["Bone" + str(bone_idx)]
-            bone.rotation_mode = 'QUATERNION'
-            if bone_idx == 0:
-                bone.location = root_bone_positions[0]
-            bone.rotation_quaternion = joints_angles[bone_idx][0]
-        return armature_obj
+    animation_data = armature_obj.animation_data_create()
+    action = bpy.data.actions.new(name="Joints_action")
+    animation_data.action = action
+    slot = action.slots.new(id_type='OBJECT', name="Joints_slot")
+    layer = action.layers.new("Layer")
+    animation_data.action_slot = slot
+    strip = layer.strips.new(type='KEYFRAME')
+    channelbag = strip.channelbag(slot, ensure=True)
 
     for bone_idx in range(joints_quantity):
         bone_name = "Bone" + str(bone_idx)
@@ -1051,6 +1312,305 @@ def get_armature_obj(file_path, collection, type='', fix_coas_man_head=False):
     return armature_obj
 
 
+def get_bind_pose_matrices(an_data, fix_coas_man_head=False):
+    # per bone GM space matrices taking the frame 0 pose, the one GM vertices are stored in, back to the rest pose
+    parent_indices = an_data.get('parentIndices')
+    root_bone_positions = an_data.get('rootBonePositions')
+    joints_angles = an_data.get('jointsAngles')
+
+    heads = []
+    for idx, prepared_pos in enumerate(an_data.get('blenderStartJointsPositions')):
+        if fix_coas_man_head and str(idx) in fixed_coas_man_head_pos:
+            prepared_pos = fixed_coas_man_head_pos[str(idx)]
+        heads.append(mathutils.Vector(
+            (prepared_pos[0], prepared_pos[1] - 0.00001, prepared_pos[2])))
+
+    pose_matrices = []
+    bind_pose_matrices = numpy.empty((len(heads), 4, 4), dtype=numpy.float64)
+    for idx, head in enumerate(heads):
+        rotation = mathutils.Quaternion(joints_angles[idx][0]).normalized().to_matrix().to_4x4()
+        if idx == 0:
+            pose_matrix = mathutils.Matrix.Translation(head) @ mathutils.Matrix.Translation(
+                root_bone_positions[0]) @ rotation
+        else:
+            parent_idx = parent_indices[idx]
+            pose_matrix = pose_matrices[parent_idx] @ mathutils.Matrix.Translation(
+                head - heads[parent_idx]) @ rotation
+        pose_matrices.append(pose_matrix)
+
+        bind_pose_matrices[idx] = mathutils.Matrix.Translation(head) @ pose_matrix.inverted()
+
+    return bind_pose_matrices
+
+
+def bake_bind_pose(vertices, normals, first_bone_ids, second_bone_ids, weights, bind_pose_matrices):
+    first_bone_ids = numpy.asarray(first_bone_ids, dtype=numpy.int64)
+    second_bone_ids = numpy.asarray(second_bone_ids, dtype=numpy.int64)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+
+    # linear blend of the two bones, normalized like the armature modifier does, bones missing from the skeleton skipped
+    blended = numpy.zeros((len(vertices), 3, 4), dtype=numpy.float64)
+    total = numpy.zeros(len(vertices), dtype=numpy.float64)
+    for bone_ids, bone_weights in ((first_bone_ids, weights), (second_bone_ids, 1.0 - weights)):
+        valid = numpy.flatnonzero((bone_ids >= 0) & (bone_ids < len(bind_pose_matrices)))
+        blended[valid] += bone_weights[valid, None, None] * bind_pose_matrices[bone_ids[valid], :3]
+        total[valid] += bone_weights[valid]
+
+    deformed = total > 0.0001
+    blended[deformed] /= total[deformed, None, None]
+    blended[~deformed] = numpy.eye(3, 4)
+
+    baked_vertices = numpy.einsum('nij,nj->ni', blended[:, :, :3], vertices) + blended[:, :, 3]
+    baked_normals = numpy.einsum('nij,nj->ni', blended[:, :, :3], normals)
+    lengths = numpy.linalg.norm(baked_normals, axis=1, keepdims=True)
+    numpy.divide(baked_normals, lengths, out=baked_normals, where=lengths > 0)
+
+    return baked_vertices.astype(numpy.float32), baked_normals.astype(numpy.float32)
+
+
+def fill_mesh(me, vertices, normals, faces, uv_sets):
+    loop_vertices = faces.ravel().astype(numpy.int32)
+
+    me.vertices.add(len(vertices))
+    me.vertices.foreach_set("co", numpy.ascontiguousarray(vertices, dtype=numpy.float32).ravel())
+
+    me.loops.add(len(loop_vertices))
+    me.loops.foreach_set("vertex_index", loop_vertices)
+
+    me.polygons.add(len(faces))
+    me.polygons.foreach_set("loop_start", numpy.arange(0, len(loop_vertices), 3, dtype=numpy.int32))
+    me.polygons.foreach_set("use_smooth", numpy.ones(len(faces), dtype=bool))
+
+    for uv_name, uv in uv_sets:
+        uv_layer = me.uv_layers.new(name=uv_name)
+        uv_layer.data.foreach_set("uv", uv[loop_vertices].ravel())
+
+    # drops degenerate and duplicate faces, bm.faces.new used to reject them
+    me.validate(clean_customdata=False)
+    me.update()
+
+    me.normals_split_custom_set_from_vertices(numpy.ascontiguousarray(normals, dtype=numpy.float32))
+
+
+def fill_vertex_colors(me, colors):
+    # loops are read back, validate() may have dropped some
+    loop_vertices = numpy.empty(len(me.loops), dtype=numpy.int32)
+    me.loops.foreach_get("vertex_index", loop_vertices)
+
+    col = me.color_attributes.new(name="Col", type='BYTE_COLOR', domain='CORNER')
+    col.data.foreach_set("color_srgb", (colors[loop_vertices] / numpy.float32(255)).ravel())
+    me.color_attributes.active_color = col
+
+
+def add_bone_weights(ob, first_bone_ids, second_bone_ids, weights):
+    first_bone_ids = numpy.asarray(first_bone_ids, dtype=numpy.int32)
+    second_bone_ids = numpy.asarray(second_bone_ids, dtype=numpy.int32)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+
+    # groups are created once, in the order their bones first appear
+    interleaved_ids = numpy.stack([first_bone_ids, second_bone_ids], axis=1).ravel()
+    unique_ids, first_seen = numpy.unique(interleaved_ids, return_index=True)
+    groups = {}
+    for bone_id in unique_ids[numpy.argsort(first_seen)].tolist():
+        if bone_id < 0:
+            continue
+        bone_name = "Bone" + str(bone_id)
+        group = ob.vertex_groups.get(bone_name)
+        groups[bone_id] = group if group is not None else ob.vertex_groups.new(name=bone_name)
+
+    # one add() per (bone, weight) bucket; each slot separately, so a vertex is never twice in one call
+    for bone_ids, bone_weights in ((first_bone_ids, weights), (second_bone_ids, 1.0 - weights)):
+        pairs = numpy.empty(len(bone_ids), dtype=[("bone", "<i4"), ("weight", "<f8")])
+        pairs["bone"] = bone_ids
+        pairs["weight"] = bone_weights
+
+        buckets, inverse = numpy.unique(pairs, return_inverse=True)
+        order = numpy.argsort(inverse, kind="stable")
+        splits = numpy.cumsum(numpy.bincount(inverse.ravel(), minlength=len(buckets)))[:-1]
+        for (bone_id, weight), indices in zip(buckets.tolist(), numpy.split(order, splits)):
+            if bone_id < 0:
+                continue
+            groups[bone_id].add(indices.tolist(), weight, 'ADD')
+
+
+gm_images = {}
+
+pending_images = deque()
+image_prefetch = {}
+image_prefetch_executor = None
+
+
+def warm_image_file(image_path):
+    # only pulls the file into the OS cache, blender reads it later on the main thread
+    with open(image_path, mode='rb') as file:
+        while file.read(1 << 20):
+            pass
+
+
+def load_pending_images():
+    # one image per timer tick, so the UI keeps responding while textures stream in
+    while len(pending_images) > 0:
+        (key, image_name, image_path) = pending_images[0]
+        future = image_prefetch.get(image_path)
+        if future is not None and not future.done():
+            return 0.05
+
+        pending_images.popleft()
+        image_prefetch.pop(image_path, None)
+
+        # the name alone could match an unrelated image the user made since
+        placeholder = bpy.data.images.get(image_name)
+        if placeholder is None or placeholder.get("gm_placeholder") != key:
+            continue
+
+        try:
+            image = bpy.data.images.load(image_path)
+        except RuntimeError as error:
+            print('Warning: ' + str(error))
+            continue
+
+        placeholder.user_remap(image)
+        bpy.data.images.remove(placeholder)
+        image.name = image_name
+        gm_images[key] = image.name
+        return 0.0
+
+    return None
+
+
+def defer_image(key, image_path):
+    global image_prefetch_executor
+
+    image = bpy.data.images.new(os.path.basename(image_path), width=1, height=1)
+    image.pixels = [0.5, 0.5, 0.5, 1]
+    image["gm_placeholder"] = key
+
+    if image_prefetch_executor is None:
+        image_prefetch_executor = ThreadPoolExecutor(max_workers=2)
+    image_prefetch[image_path] = image_prefetch_executor.submit(warm_image_file, image_path)
+    pending_images.append((key, image.name, image_path))
+
+    if not bpy.app.timers.is_registered(load_pending_images):
+        bpy.app.timers.register(load_pending_images, first_interval=0.1)
+    return image
+
+
+@bpy.app.handlers.persistent
+def clear_pending_images(*args):
+    # queued names refer to the blend file being closed
+    pending_images.clear()
+    for future in image_prefetch.values():
+        future.cancel()
+    image_prefetch.clear()
+
+
+def is_image_of(image, key):
+    # after File > New or Open the remembered name can belong to another image
+    if "gm_placeholder" in image:
+        return image["gm_placeholder"] == key
+    return os.path.normcase(os.path.abspath(bpy.path.abspath(image.filepath))) == key
+
+
+def get_image(image_path, image_name, defer=False):
+    # one image per file no matter how blender postfixed its name; names are kept instead of datablocks, they survive undo
+    key = os.path.normcase(os.path.abspath(image_path))
+    image = bpy.data.images.get(gm_images.get(key, ''))
+    if image is not None and is_image_of(image, key):
+        return image
+
+    if os.path.isfile(image_path):
+        if defer:
+            image = defer_image(key, image_path)
+        else:
+            image = bpy.data.images.load(image_path, check_existing=True)
+    else:
+        image = bpy.data.images.new(image_name, width=1, height=1)
+        image.pixels = [0.5, 0.5, 0.5, 1]
+        image["gm_placeholder"] = key
+
+    gm_images[key] = image.name
+    return image
+
+
+def get_material_template(with_normals, report_func):
+    # hidden materials with the node tree prebuilt, imported materials are copies with their images swapped
+    template_name = '.GM Template Normals' if with_normals else '.GM Template'
+    template = bpy.data.materials.get(template_name)
+    if template is not None:
+        return template
+
+    mtl = bpy.data.materials.new(name=template_name)
+
+    mtl.use_nodes = True
+    mtl.blend_method = 'CLIP'
+
+    principled_node = None
+    for node in mtl.node_tree.nodes:
+        if node.type == 'BSDF_PRINCIPLED':
+            principled_node = node
+            break
+
+    if principled_node is None:
+        bpy.data.materials.remove(mtl)
+        report_func({'ERROR'}, "No Principled BSDF node found in the material.")
+        return None
+    bsdf = principled_node
+
+    specular_input = None
+    for i, o in enumerate(bsdf.inputs):
+        if o.name == 'Specular IOR Level':
+            specular_input = o
+
+    if specular_input is None:
+        bpy.data.materials.remove(mtl)
+        report_func({'ERROR'}, "No Specular IOR Level input found in the material.")
+        return None
+    specular_input.default_value = 0
+
+    tex = mtl.node_tree.nodes.new('ShaderNodeTexImage')
+    tex.name = 'Texture'
+
+    mtl.node_tree.links.new(
+        bsdf.inputs['Alpha'], tex.outputs['Alpha'])
+
+    if with_normals:
+        normalTex = mtl.node_tree.nodes.new('ShaderNodeTexImage')
+        normalTex.name = 'Normals Texture'
+
+        normalUVMap = mtl.node_tree.nodes.new('ShaderNodeUVMap')
+        normalUVMap.uv_map = "UVMap_normals"
+
+        mixer = mtl.node_tree.nodes.new('ShaderNodeMix')
+        mixer.data_type = 'RGBA'
+        mixer.blend_type = 'MULTIPLY'
+        mixer.inputs['Factor'].default_value = 1.0
+
+        gray_divider = mtl.node_tree.nodes.new('ShaderNodeMix')
+        gray_divider.data_type = 'RGBA'
+        gray_divider.blend_type = 'DIVIDE'
+        gray_divider.inputs['Factor'].default_value = 1.0
+        gray_divider.inputs[7].default_value = (
+            0.2, 0.2, 0.2, 1)
+
+        mtl.node_tree.links.new(
+            mixer.inputs[6], tex.outputs['Color'])
+
+        mtl.node_tree.links.new(
+            gray_divider.inputs[6], normalTex.outputs['Color'])
+        mtl.node_tree.links.new(
+            mixer.inputs[7], gray_divider.outputs[2])
+        mtl.node_tree.links.new(
+            normalTex.inputs['Vector'], normalUVMap.outputs['UV'])
+
+        mtl.node_tree.links.new(
+            bsdf.inputs['Base Color'], mixer.outputs[2])
+    else:
+        mtl.node_tree.links.new(
+            bsdf.inputs['Base Color'], tex.outputs['Color'])
+
+    return mtl
+
+
 def import_gm(
     context,
     hull_num_int,
@@ -1065,10 +1625,12 @@ def import_gm(
     convert_jess_to_woman=False,
     convert_woman_to_danny=False,
     convert_jess_to_danny=False,
-    report_func=None
+    report_func=None,
+    cache_path="",
+    defer_textures=False
 ):
     file_name = os.path.basename(file_path)[:-3]
-    data = parse_gm(file_path, report_func)
+    data = load_gm(file_path, report_func, cache_path)
 
     xIsMirrored = data.get('xIsMirrored')
 
@@ -1083,45 +1645,43 @@ def import_gm(
     root['ExportType'] = 'Model'
 
     if has_animation:
+        an_data = load_an(an_path)
+
         armature_obj = get_armature_obj(
-            an_path, collection, fix_coas_man_head=fix_coas_man_head)
+            an_path, collection, an_data, fix_coas_man_head=fix_coas_man_head)
         armature_obj.parent = root
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
 
-        armature_obj_pose = get_armature_obj(
-            an_path, collection, 'POSE', fix_coas_man_head=fix_coas_man_head)
-        armature_obj_pose_source = get_armature_obj(
-            an_path, collection, 'POSE_SOURCE', fix_coas_man_head=fix_coas_man_head)
+        bind_pose_matrices = get_bind_pose_matrices(an_data, fix_coas_man_head)
 
-    blender_objects = []
-    for object in data['objects']:
-        name = object.get('name')
+    correction = numpy.array(correction_matrix, dtype=numpy.float32)
+    bone_remap_table = get_bone_remap_table([name for name, enabled in (
+        ('coas_to_potc_man', convert_coas_to_potc_man),
+        ('coas_to_potc_woman', convert_coas_to_potc_woman),
+        ('potc_to_coas_man', convert_potc_to_coas_man),
+        ('potc_to_coas_woman', convert_potc_to_coas_woman),
+        ('jess_to_woman', convert_jess_to_woman),
+        ('woman_to_danny', convert_woman_to_danny),
+        ('jess_to_danny', convert_jess_to_danny),
+    ) if enabled])
+    texture_resolver = get_texture_resolver(textures_path)
 
-        vertices = object.get('verticies')
-        normals = object.get('normals')
-        uv_array = object.get('uv')
-        uv_normals_array = object.get('uvNormals')
-        faces = object.get('faces')
-        colors = object.get('colors')
+    for object in data['objects']:
+        name = object.name
 
-        weights = object.get('weights')
-        bone_ids = object.get('boneIds')
+        vertices = object.vertices
+        normals = object.normals
+        uv_array = object.uv
+        uv_normals_array = object.uv_normals
+        faces = object.faces
 
-        material = object.get('material')
+        material = object.material
 
         me = bpy.data.meshes.new(name)
         ob = bpy.data.objects.new(name, me)
-        blender_objects.append(ob)
         ob.parent = root
 
-        bm = bmesh.new()
-        bm.from_mesh(me)
-        uv_layer = bm.loops.layers.uv.new()
-        if uv_normals_array is not None:
-            uv_normals_layer = bm.loops.layers.uv.new('UVMap_normals')
-
         collection.objects.link(ob)
-        bpy.context.view_layer.objects.active = ob
-        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
 
         # setup our material
 
@@ -1135,43 +1695,16 @@ def import_gm(
 
 
         if texture_file is not None:
-            texture_file = texture_file.split('\\')[-1]
-            texture_file = texture_file.split('/')[-1]
-            if texture_file.endswith('.tga.tx'):
-                texture_file = texture_file[:-3]
+            texture_file = get_texture_file_name(texture_file)
         if texture_normals_file is not None:
-            texture_normals_file = texture_normals_file.split('\\')[-1]
-            texture_normals_file = texture_normals_file.split('/')[-1]
-            if texture_normals_file.endswith('.tga.tx'):
-                texture_normals_file = texture_normals_file[:-3]
+            texture_normals_file = get_texture_file_name(texture_normals_file)
         #-------------------------------------------------
         #  Addition from Tosyk 4 dec 2022 START
         #-------------------------------------------------
-        hull_num = hull_num_int
         texture_path_found = None
 
         if texture_file is not None:
-            for ship_dir in Path(textures_path).rglob(f'**/{file_name}'):
-                for hull_dir in ([f'hull{hull_num}',] if hull_num is not None else []) + ['hull1']:
-                    if (ship_dir/hull_dir).exists() and (ship_dir/hull_dir/texture_file).exists():
-                        texture_path_found = ship_dir/hull_dir/texture_file
-                        break
-                if texture_path_found is not None:
-                    break
-
-            if texture_path_found is None:
-                for ship_dir in Path(textures_path).rglob(f'**/{file_name}'):
-                    for tex_file in ship_dir.rglob(f'**/{texture_file}'):
-                        texture_path_found = tex_file
-                        break
-                    if texture_path_found is not None:
-                        break
-
-            if texture_path_found is None:
-                for ship_dir in Path(textures_path).rglob(f'**/{texture_file}'):
-                    texture_path_found = ship_dir
-                    break
-
+            texture_path_found = texture_resolver.find(file_name, hull_num_int, texture_file)
             texture_path_found = texture_path_found or os.path.join(textures_path, texture_file)
 
         #-------------------------------------------------
@@ -1192,243 +1725,45 @@ def import_gm(
         if material_name is not None and material_name in bpy.data.materials:
             mtl = bpy.data.materials[material_name]
         elif texture_file is not None:
-            mtl = bpy.data.materials.new(name=material_name)
-
-            mtl.use_nodes = True
-            mtl.blend_method = 'CLIP'
-
-            principled_node = None
-            for node in mtl.node_tree.nodes:
-                if node.type == 'BSDF_PRINCIPLED':
-                    principled_node = node
-                    break
+            template = get_material_template(texture_normals_file is not None, report_func)
+            if template is None:
+                return {'CANCELLED'}
 
-            
-            if principled_node is None:
-                report_func({'ERROR'}, "No Principled BSDF node found in the material.")
-                return {'CANCELLED'} 
-            bsdf = principled_node
-
-
-            specular_input = None
-            for i, o in enumerate(bsdf.inputs):
-                if o.name == 'Specular IOR Level':
-                    specular_input = o
-
-            if specular_input is None:
-                report_func({'ERROR'}, "No Specular IOR Level input found in the material.")
-                return {'CANCELLED'} 
-            specular_input.default_value = 0
-
-            # load texture onto the material
-            if texture_file in bpy.data.textures:
-                mtex = mtl.texture_slots.add()
-                mtex.texture = bpy.data.textures[texture_file]
-            else:
-                tex = mtl.node_tree.nodes.new('ShaderNodeTexImage')
-
-                if texture_file in bpy.data.images:
-                    tex.image = bpy.data.images[texture_file]
-                else:
-                    if os.path.isfile(texture_path):
-                        tex.image = bpy.data.images.load(texture_path)
-                    else:
-                        placeholder_image = bpy.data.images.new(texture_file, width=1, height=1)
-                        placeholder_image.pixels = [0.5,0.5,0.5,1]
-                        tex.image = placeholder_image
-
-                mtl.node_tree.links.new(
-                    bsdf.inputs['Alpha'], tex.outputs['Alpha'])
-
-                if texture_normals_file is not None:
-                    normalTex = mtl.node_tree.nodes.new('ShaderNodeTexImage')
-
-                    if texture_normals_file in bpy.data.images:
-                        normalTex.image = bpy.data.images[texture_normals_file]
-                    else:
-                        if os.path.isfile(texture_normals_path):
-                            normalTex.image = bpy.data.images.load(texture_normals_path)
-                        else:
-                            placeholder_image = bpy.data.images.new(texture_normals_file, width=1, height=1)
-                            placeholder_image.pixels = [0.5,0.5,0.5,1]
-                            normalTex.image = placeholder_image
-
-                    normalUVMap = mtl.node_tree.nodes.new('ShaderNodeUVMap')
-                    normalUVMap.uv_map = "UVMap_normals"
-
-                    mixer = mtl.node_tree.nodes.new('ShaderNodeMix')
-                    mixer.data_type = 'RGBA'
-                    mixer.blend_type = 'MULTIPLY'
-                    mixer.inputs['Factor'].default_value = 1.0
-
-                    gray_divider = mtl.node_tree.nodes.new('ShaderNodeMix')
-                    gray_divider.data_type = 'RGBA'
-                    gray_divider.blend_type = 'DIVIDE'
-                    gray_divider.inputs['Factor'].default_value = 1.0
-                    gray_divider.inputs[7].default_value = (
-                        0.2, 0.2, 0.2, 1)
-
-                    mtl.node_tree.links.new(
-                        mixer.inputs[6], tex.outputs['Color'])
-
-                    mtl.node_tree.links.new(
-                        gray_divider.inputs[6], normalTex.outputs['Color'])
-                    mtl.node_tree.links.new(
-                        mixer.inputs[7], gray_divider.outputs[2])
-                    mtl.node_tree.links.new(
-                        normalTex.inputs['Vector'], normalUVMap.outputs['UV'])
-
-                    mtl.node_tree.links.new(
-                        bsdf.inputs['Base Color'], mixer.outputs[2])
-                else:
-                    mtl.node_tree.links.new(
-                        bsdf.inputs['Base Color'], tex.outputs['Color'])
+            mtl = template.copy()
+            mtl.name = material_name
+            mtl.node_tree.nodes['Texture'].image = get_image(texture_path, texture_file, defer_textures)
+            if texture_normals_file is not None:
+                mtl.node_tree.nodes['Normals Texture'].image = get_image(texture_normals_path, texture_normals_file, defer_textures)
 
         if mtl is not None:
             ob.data.materials.append(mtl)
 
-        for x in range(len(vertices)):
-            vtx = bm.verts.new(vertices[x])
-            vtx.normal = mathutils.Vector(normals[x])
-
-        bm.verts.ensure_lookup_table()
-        for f in faces:
-            try:
-                face = bm.faces.new(
-                    (bm.verts[f[0]], bm.verts[f[1]], bm.verts[f[2]]))
-                face.smooth = True
-                face.material_index = 0
-
-                for uv_set_loop in range(3):
-                    face.loops[uv_set_loop][uv_layer].uv = uv_array[f[uv_set_loop]]
-
-                    if uv_normals_array is not None:
-                        face.loops[uv_set_loop][uv_normals_layer].uv = uv_normals_array[f[uv_set_loop]]
-
-            except Exception as e:
-                print(str(e))
-
-        bmesh.ops.rotate(bm, verts=bm.verts, cent=(
-            0.0, 0.0, 0.0), matrix=correction_matrix)
-
-        """ TODO backface Culling """
-
-        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-        bm.to_mesh(me)
-        bm.free()
+        uv_sets = [('UVMap', uv_array)]
+        if uv_normals_array is not None:
+            uv_sets.append(('UVMap_normals', uv_normals_array))
 
         if is_animated:
-            for x in range(len(vertices)):
-                weight = weights[x]
-                first_bone_idx = bone_ids[x][0]
-                second_bone_idx = bone_ids[x][1]
-
-                if convert_coas_to_potc_man or convert_coas_to_potc_woman:
-                    if convert_coas_to_potc_man:
-                        converted_first_bone_idx = coas_to_potc_man.get(
-                            str(bone_ids[x][0]))
-                        converted_second_bone_idx = coas_to_potc_man.get(
-                            str(bone_ids[x][1]))
-
-                    if convert_coas_to_potc_woman:
-                        converted_first_bone_idx = coas_to_potc_woman.get(
-                            str(bone_ids[x][0]))
-                        converted_second_bone_idx = coas_to_potc_woman.get(
-                            str(bone_ids[x][1]))
-
-                    if converted_first_bone_idx is None:
-                        converted_first_bone_idx = 16
-                    if converted_second_bone_idx is None:
-                        converted_second_bone_idx = 16
-
-                    first_bone_idx = converted_first_bone_idx
-                    second_bone_idx = converted_second_bone_idx
-
-                if convert_potc_to_coas_man:
-                    first_bone_idx = potc_to_coas_man.get(str(bone_ids[x][0]))
-                    second_bone_idx = potc_to_coas_man.get(str(bone_ids[x][1]))
-
-                if convert_potc_to_coas_woman:
-                    first_bone_idx = potc_to_coas_woman.get(str(bone_ids[x][0]))
-                    second_bone_idx = potc_to_coas_woman.get(str(bone_ids[x][1]))
-                    
-                if convert_jess_to_woman:
-                    first_bone_idx = jess_to_woman.get(str(bone_ids[x][0]))
-                    second_bone_idx = jess_to_woman.get(str(bone_ids[x][1]))
-                    
-                if convert_woman_to_danny:
-                    first_bone_idx = woman_to_danny.get(str(bone_ids[x][0]))
-                    second_bone_idx = woman_to_danny.get(str(bone_ids[x][1]))  
-                    
-                if convert_jess_to_danny:
-                    first_bone_idx = jess_to_danny.get(str(bone_ids[x][0]))
-                    second_bone_idx = jess_to_danny.get(str(bone_ids[x][1]))
-                    
-                    
-
-                first_bone_name = "Bone" + str(first_bone_idx)
-                second_bone_name = "Bone" + str(second_bone_idx)
-
-                if ob.vertex_groups.get(first_bone_name) is None:
-                    ob.vertex_groups.new(name=first_bone_name)
-                if ob.vertex_groups.get(second_bone_name) is None:
-                    ob.vertex_groups.new(name=second_bone_name)
-
-                ob.vertex_groups[first_bone_name].add([x], weight, 'ADD')
-                ob.vertex_groups[second_bone_name].add(
-                    [x], 1.0 - weight, 'ADD')
-
-        col = me.vertex_colors.new()
-
-        for polygon in me.polygons:
-            for i, index in enumerate(polygon.vertices):
-                loop_index = polygon.loop_indices[i]
-                col.data[loop_index].color = colors[index]
+            object_bone_ids = object.bone_ids if bone_remap_table is None else bone_remap_table[object.bone_ids]
+            first_bone_ids = object_bone_ids[:, 0]
+            second_bone_ids = object_bone_ids[:, 1]
 
         if has_animation:
-            ob.parent = armature_obj_pose
-            modifier = ob.modifiers.new(type='ARMATURE', name="Armature")
-            modifier.object = armature_obj_pose
-            modifier.use_deform_preserve_volume = True
-            bpy.context.view_layer.objects.active = armature_obj_pose
+            vertices, normals = bake_bind_pose(
+                vertices, normals, first_bone_ids, second_bone_ids, object.weights, bind_pose_matrices)
 
-    if has_animation:
-        bpy.ops.pose.armature_apply(selected=False)
-
-        bpy.ops.object.mode_set(mode='POSE', toggle=False)
-
-        for pbone in armature_obj.data.bones:
-            bone_name = pbone.name
-
-            bone = armature_obj_pose.pose.bones[bone_name]
-            active = armature_obj_pose_source.pose.bones[bone_name]
-
-            bone.location = getmat(
-                bone, active, context, False).to_translation()
-            bone.rotation_quaternion = getmat(
-                bone, active, context, not bone.id_data.data.bones[bone.name].use_inherit_rotation).to_3x3().to_quaternion()
+        fill_mesh(me, vertices @ correction.T, normals @ correction.T, faces, uv_sets)
 
-            """ hack """
-            bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-
-        for blender_object in blender_objects:
-            bpy.context.view_layer.objects.active = blender_object
-            bpy.ops.object.modifier_apply(modifier="Armature")
+        if is_animated:
+            add_bone_weights(ob, first_bone_ids, second_bone_ids, object.weights)
 
-        bpy.data.objects.remove(armature_obj_pose_source, do_unlink=True)
-        bpy.data.objects.remove(armature_obj_pose, do_unlink=True)
+        fill_vertex_colors(me, object.colors)
 
-        for blender_object in blender_objects:
-            blender_object.parent = armature_obj
-            modifier = blender_object.modifiers.new(type='ARMATURE', name="Armature")
+        if has_animation:
+            ob.parent = armature_obj
+            modifier = ob.modifiers.new(type='ARMATURE', name="Armature")
             modifier.object = armature_obj
             modifier.use_deform_preserve_volume = True
 
-            """ hack, texture is too dark without it """
-            bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-
     for locators_tree in data['locatorsTrees']:
         group_locator_name = locators_tree
         group_locator = bpy.data.objects.new(group_locator_name, None)
@@ -1443,34 +1778,16 @@ def import_gm(
             collection.objects.link(locator)
             locator.empty_display_type = 'ARROWS'
             locator.parent = group_locator
-            locator.matrix_basis = locator_m
+            locator.matrix_basis = numpy.asarray(locator_m).tolist()
             locator.empty_display_size = 0.5
             if has_animation and locator_bone_idx > 0:
                 locator.parent = armature_obj
+                if bone_remap_table is not None:
+                    locator_bone_idx = int(bone_remap_table[locator_bone_idx]) if locator_bone_idx < MAX_BONES else -1
                 if "Bone" + str(locator_bone_idx) not in armature_obj.pose.bones:
                     continue
                 bone = armature_obj.pose.bones["Bone" + str(locator_bone_idx)]
 
-                if convert_potc_to_coas_man:
-                    bone = armature_obj.pose.bones["Bone" +
-                                                   potc_to_coas_man.get(str(locator_bone_idx))]
-
-                if convert_potc_to_coas_woman:
-                    bone = armature_obj.pose.bones["Bone" +
-                                                   potc_to_coas_woman.get(str(locator_bone_idx))]
-                                                   
-                if convert_jess_to_woman:
-                    bone = armature_obj.pose.bones["Bone" +
-                                                   jess_to_woman.get(str(locator_bone_idx))]
-                if convert_woman_to_danny:
-                    bone = armature_obj.pose.bones["Bone" +
-                                                   woman_to_danny.get(str(locator_bone_idx))]
-                if convert_jess_to_danny:
-                    bone = armature_obj.pose.bones["Bone" +
-                                                   jess_to_danny.get(str(locator_bone_idx))]                            
-
-                                            
-
                 locator.parent_bone = bone.name
                 locator.parent_type = 'BONE'
                 locator.matrix_parent_inverse = bone.matrix.inverted()
@@ -1487,26 +1804,25 @@ def import_gm(
     return {'FINISHED'}
 
 
-class ImportGm(Operator, ImportHelper):
-    """This appears in the tooltip of the operator and in the generated docs"""
-    bl_idname = "import.gm"
-    bl_label = "Import GM"
-
-    # ImportHelper mixin class uses this
-    filename_ext = ".gm"
-
-    filter_glob: StringProperty(
-        default="*.gm",
-        options={'HIDDEN'},
-        maxlen=255,  # Max internal buffer length, longer would be clamped.
-    )
-
+class ImportGmOptions:
     textures_path: StringProperty(
         name="Textures path",
         description="Path to textures (relative or absolute)",
         default="textures",
     )
 
+    cache_path: StringProperty(
+        name="Cache path",
+        description="Folder for decoded GM cache (relative or absolute, empty - keep in memory only)",
+        default="",
+    )
+
+    defer_textures: BoolProperty(
+        name="Load textures after import",
+        description="Show the model with placeholder textures right away and load the images in the background",
+        default=False,
+    )
+
     an_name: StringProperty(
         name="Animation name",
         description="Must be in the same folder as model",
@@ -1563,17 +1879,16 @@ class ImportGm(Operator, ImportHelper):
         min = 0,
         max = 64
     )
-    
-    
 
-    def execute(self, context):
-        an_path = os.path.join(os.path.dirname(self.filepath), self.an_name)
-        textures_path = os.path.join(os.path.dirname(self.filepath), self.textures_path)
+    def import_file(self, context, file_path):
+        an_path = os.path.join(os.path.dirname(file_path), self.an_name)
+        textures_path = os.path.join(os.path.dirname(file_path), self.textures_path)
+        cache_path = os.path.join(os.path.dirname(file_path), self.cache_path) if self.cache_path else ""
         if os.path.isfile(an_path):
             return import_gm(
                 context,
                 self.hull_num_int, # Addition from Tosyk 4 dec 2022
-                self.filepath,
+                file_path,
                 textures_path=textures_path,
                 an_path=an_path,
                 fix_coas_man_head=self.fix_coas_man_head,
@@ -1584,23 +1899,109 @@ class ImportGm(Operator, ImportHelper):
                 convert_jess_to_woman=self.convert_jess_to_woman,
                 convert_woman_to_danny=self.convert_woman_to_danny,
                 convert_jess_to_danny=self.convert_jess_to_danny,
-                report_func=self.report
+                report_func=self.report,
+                cache_path=cache_path,
+                defer_textures=self.defer_textures
             )
 
-        return import_gm(context, self.hull_num_int, self.filepath, textures_path=textures_path, report_func=self.report)
+        return import_gm(context, self.hull_num_int, file_path, textures_path=textures_path, report_func=self.report, cache_path=cache_path, defer_textures=self.defer_textures)
+
+
+class ImportGm(Operator, ImportHelper, ImportGmOptions):
+    """This appears in the tooltip of the operator and in the generated docs"""
+    bl_idname = "import.gm"
+    bl_label = "Import GM"
+
+    # ImportHelper mixin class uses this
+    filename_ext = ".gm"
+
+    filter_glob: StringProperty(
+        default="*.gm",
+        options={'HIDDEN'},
+        maxlen=255,  # Max internal buffer length, longer would be clamped.
+    )
+
+    def execute(self, context):
+        return self.import_file(context, self.filepath)
+
+
+class ImportGmBatch(Operator, ImportHelper, ImportGmOptions):
+    """Import several GM files, or every GM file of a folder, sharing texture, material and animation caches"""
+    bl_idname = "import.gm_batch"
+    bl_label = "Batch Import GM"
+
+    filename_ext = ".gm"
+
+    filter_glob: StringProperty(
+        default="*.gm",
+        options={'HIDDEN'},
+        maxlen=255,
+    )
+
+    directory: StringProperty(
+        subtype='DIR_PATH',
+    )
+
+    files: CollectionProperty(
+        type=OperatorFileListElement,
+    )
+
+    def execute(self, context):
+        file_names = [file.name for file in self.files if file.name]
+        if len(file_names) > 0:
+            file_paths = [os.path.join(self.directory, file_name) for file_name in file_names]
+        else:
+            file_paths = sorted(str(file_path) for file_path in Path(self.directory).glob('*.gm'))
+
+        if len(file_paths) == 0:
+            self.report({'WARNING'}, 'No GM files in ' + self.directory)
+            return {'CANCELLED'}
+
+        total_start = time.time()
+
+        imported = 0
+        for file_path in file_paths:
+            start = time.time()
+            try:
+                result = self.import_file(context, file_path)
+            except (OSError, ValueError, struct.error, IndexError, KeyError) as error:
+                self.report({'ERROR'}, '{}: {}'.format(os.path.basename(file_path), error))
+                continue
+            if 'FINISHED' in result:
+                imported += 1
+            self.report({'INFO'}, '{}: {:.2f} s'.format(os.path.basename(file_path), time.time() - start))
+
+        self.report({'INFO'}, 'Imported {} of {} GM files in {:.2f} s'.format(
+            imported, len(file_paths), time.time() - total_start))
+        return {'FINISHED'}
 
 
 def menu_func_import(self, context):
     self.layout.operator(ImportGm.bl_idname,
                          text="GM Import(.gm)")
+    self.layout.operator(ImportGmBatch.bl_idname,
+                         text="GM Batch Import(.gm)")
 
 
 def register():
     bpy.utils.register_class(ImportGm)
+    bpy.utils.register_class(ImportGmBatch)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+    bpy.app.handlers.load_pre.append(clear_pending_images)
 
 
 def unregister():
+    global image_prefetch_executor
+
+    if bpy.app.timers.is_registered(load_pending_images):
+        bpy.app.timers.unregister(load_pending_images)
+    if clear_pending_images in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(clear_pending_images)
+    clear_pending_images()
+    if image_prefetch_executor is not None:
+        image_prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        image_prefetch_executor = None
+    bpy.utils.unregister_class(ImportGmBatch)
     bpy.utils.unregister_class(ImportGm)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
 
@@ -5,6 +5,7 @@ import re
 import subprocess
 import fnmatch
 import math
+import time
 from math import cos, sin, radians
 from mathutils import Vector, kdtree
 import functools
@@ -236,6 +237,85 @@ class CapturingInfo():
         del self._stringio    # free up some memory
 
 
+TEXTURE_INDEX_CHECK_INTERVAL = 2.0
+
+
+class TextureResolver:
+    def __init__(self, textures_path):
+        self.textures_path = textures_path
+        self.files = {}
+        self.dirs = {}
+        self.dir_mtimes = {}
+        self.resolved = {}
+        self.checked_at = 0.0
+
+        # one walk instead of an rglob per lookup; same visiting order as rglob
+        for (dirpath, dirnames, filenames) in os.walk(textures_path or os.curdir):
+            self.dir_mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+            for dirname in dirnames:
+                self.dirs.setdefault(os.path.normcase(dirname), []).append(os.path.join(dirpath, dirname))
+            for filename in filenames:
+                self.files.setdefault(os.path.normcase(filename), []).append(os.path.join(dirpath, filename))
+        self.checked_at = time.monotonic()
+
+    def is_stale(self):
+        now = time.monotonic()
+        if now - self.checked_at < TEXTURE_INDEX_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+
+        for (dirpath, mtime) in self.dir_mtimes.items():
+            try:
+                if os.stat(dirpath).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def find(self, ship_name, hull_num, texture_file):
+        key = (ship_name, hull_num, texture_file)
+        if key not in self.resolved:
+            self.resolved[key] = self.lookup(ship_name, hull_num, texture_file)
+        return self.resolved[key]
+
+    def lookup(self, ship_name, hull_num, texture_file):
+        candidates = self.files.get(os.path.normcase(texture_file), [])
+        ship_dirs = self.dirs.get(os.path.normcase(ship_name), [])
+        hull_dirs = ([f'hull{hull_num}',] if hull_num is not None else []) + ['hull1']
+
+        # <ship>/hull<N>/<texture>, then <ship>/hull1/<texture>
+        candidate_keys = {os.path.normcase(candidate) for candidate in candidates}
+        for ship_dir in ship_dirs:
+            for hull_dir in hull_dirs:
+                texture_path = os.path.join(ship_dir, hull_dir, texture_file)
+                if os.path.normcase(texture_path) in candidate_keys:
+                    return texture_path
+
+        # anywhere inside the ship folder
+        for ship_dir in ship_dirs:
+            prefix = os.path.normcase(os.path.join(ship_dir, ''))
+            for candidate in candidates:
+                if os.path.normcase(candidate).startswith(prefix):
+                    return candidate
+
+        # anywhere inside the textures folder
+        if len(candidates) > 0:
+            return candidates[0]
+
+        return None
+
+
+texture_resolvers = {}
+
+
+def get_texture_resolver(textures_path):
+    resolver = texture_resolvers.get(textures_path)
+    if resolver is None or resolver.is_stale():
+        resolver = TextureResolver(textures_path)
+        texture_resolvers[textures_path] = resolver
+    return resolver
+
+
 def find_principled_node(mtl):
     principled_node = None
     for node in mtl.node_tree.nodes:
@@ -602,26 +682,7 @@ def make_tubes(context, obj, rig_obj_name, ship_name, length, bevel_depth=1.026,
         mat_name = ship_name + '_Rope_Defaul_Mat'
         texture_file = rope_tex_def_str
 
-        for ship_dir in Path(texs_path).rglob(f'**/{ship_name}'):
-            for hull_dir in ([f'hull{hull_num_int}',] if hull_num_int is not None else []) + ['hull1']:
-                if (ship_dir/hull_dir).exists() and (ship_dir/hull_dir/texture_file).exists():
-                    texture_path_found = ship_dir/hull_dir/texture_file
-                    break
-            if texture_path_found is not None:
-                break
-
-        if texture_path_found is None:
-            for ship_dir in Path(texs_path).rglob(f'**/{ship_name}'):
-                for tex_file in ship_dir.rglob(f'**/{texture_file}'):
-                    texture_path_found = tex_file
-                    break
-                if texture_path_found is not None:
-                    break
-
-        if texture_path_found is None:
-            for ship_dir in Path(texs_path).rglob(f'**/{texture_file}'):
-                texture_path_found = ship_dir
-                break
+        texture_path_found = get_texture_resolver(texs_path).find(ship_name, hull_num_int, texture_file)
 
     texture_path_found = texture_path_found or os.path.join(texs_path, texture_file)
 
@@ -1253,26 +1314,7 @@ def create_sail( s1, s2, s3, s4, type, obj, my_tool, ship_name):
     texture_path_found = None
     
     if sail_tex_def_str is not None:
-        for ship_dir in Path(texs_path).rglob(f'**/{ship_name}'):
-            for hull_dir in ([f'hull{hull_num_int}',] if hull_num_int is not None else []) + ['hull1']:
-                if (ship_dir/hull_dir).exists() and (ship_dir/hull_dir/texture_file).exists():
-                    texture_path_found = ship_dir/hull_dir/texture_file
-                    break
-            if texture_path_found is not None:
-                break
-
-        if texture_path_found is None:
-            for ship_dir in Path(texs_path).rglob(f'**/{ship_name}'):
-                for tex_file in ship_dir.rglob(f'**/{texture_file}'):
-                    texture_path_found = tex_file
-                    break
-                if texture_path_found is not None:
-                    break
-
-        if texture_path_found is None:
-            for ship_dir in Path(texs_path).rglob(f'**/{texture_file}'):
-                texture_path_found = ship_dir
-                break
+        texture_path_found = get_texture_resolver(texs_path).find(ship_name, hull_num_int, texture_file)
 
     texture_path_found = texture_path_found or os.path.join(texs_path, texture_file)
 